@@ -20,10 +20,37 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import hashlib
+import io
+import os
+import re
+from datetime import date, datetime
 from pathlib import Path
+from pandas.io.parsers import TextParser
 import warnings
 warnings.filterwarnings('ignore')
 
+# Prefer the Rust-based calamine reader for .xlsx parsing; fall back to
+# openpyxl (which pandas already opens in read-only, values-only mode)
+try:
+    import python_calamine
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    import openpyxl
+    EXCEL_ENGINE = 'openpyxl'
+
+# Use pyarrow's multithreaded CSV reader when it is installed
+try:
+    import pyarrow
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+# Parsed workbooks are cached here, keyed on file path, mtime and size
+TABLE_CACHE_DIR = Path('data') / '.cache'
+# Bump when the parsing logic changes so stale cache entries are ignored
+TABLE_CACHE_VERSION = 1
+
 # Set plotting style
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
@@ -46,55 +73,120 @@ print("Libraries imported successfully")
 # EXCEL TABLE PARSING FUNCTIONS
 # ============================================================================
 
-def identify_table_boundaries(df):
+def convert_excel_cell(value):
+    """
+    Convert a raw worksheet cell the same way pd.read_excel does.
+    
+    Empty cells become '' (turned into NaN by TextParser), integral floats
+    become ints and dates become datetimes.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        int_value = int(value)
+        return int_value if int_value == value else value
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def iter_sheet_rows(file_path, sheet_name):
     """
-    Identify boundaries of all tables in the Excel sheet.
+    Stream the rows of a worksheet without materializing the whole sheet.
     
-    Tables are separated by empty rows. This function identifies the start
-    and end row indices for each table.
+    Uses the calamine reader when available, otherwise openpyxl in
+    read-only mode.
     
     Args:
-        df: DataFrame loaded from Excel with header=None
+        file_path: Path to the Excel file
+        sheet_name: Name of the sheet to read
         
-    Returns:
-        List of tuples (start_row, end_row, table_name) for each table
+    Yields:
+        List of converted cell values for each row, starting from row 1
+    """
+    if EXCEL_ENGINE == 'calamine':
+        sheet = python_calamine.CalamineWorkbook.from_path(file_path).get_sheet_by_name(sheet_name)
+        # An empty sheet has no start cell and no rows
+        if sheet.start is None:
+            return
+        # calamine skips empty leading rows/columns; pad so indices match the sheet
+        start_row, start_col = sheet.start
+        for _ in range(start_row):
+            yield []
+        for row in sheet.iter_rows():
+            yield [''] * start_col + [convert_excel_cell(v) for v in row]
+    else:
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for row in workbook[sheet_name].iter_rows(values_only=True):
+                yield [convert_excel_cell(v) for v in row]
+        finally:
+            workbook.close()
+
+
+def iter_sheet_tables(file_path, sheet_name):
     """
-    tables = []
-    current_table_start = None
-    current_table_name = None
-    
-    for idx in range(len(df)):
-        row = df.iloc[idx]
-        # Check if row is completely empty (all NaN)
-        is_empty = row.isna().all()
+    Stream a worksheet and emit each table as soon as its closing empty row is read.
+    
+    Tables are separated by empty rows. Only the rows of the current table
+    are held in memory; each finished table is converted with pandas'
+    TextParser, the same parser pd.read_excel uses, and handed out as an
+    object array for positional access.
+    
+    Args:
+        file_path: Path to the Excel file
+        sheet_name: Name of the sheet to read
+        
+    Yields:
+        Tuples (start_row, end_row, values) for each table
+    """
+    current_rows = []
+    current_start = None
+    
+    def finish_table(end_row):
+        width = max(len(row) for row in current_rows)
+        rows = [row + [''] * (width - len(row)) for row in current_rows]
+        values = TextParser(rows, header=None).read().to_numpy(dtype=object)
+        return current_start, end_row, values
+    
+    for idx, row in enumerate(iter_sheet_rows(file_path, sheet_name)):
+        is_empty = all(v == '' for v in row)
         
         if not is_empty:
-            if current_table_start is None:
+            if current_start is None:
                 # Start of a new table
-                current_table_start = idx
-                # Try to get table name from first non-NaN value
-                first_val = row.dropna().iloc[0] if not row.dropna().empty else f"Table_{len(tables)+1}"
-                current_table_name = str(first_val)
-        else:
-            if current_table_start is not None:
-                # End of current table
-                tables.append((current_table_start, idx - 1, current_table_name))
-                current_table_start = None
-                current_table_name = None
+                current_start = idx
+            current_rows.append(row)
+        elif current_start is not None:
+            # End of current table
+            yield finish_table(idx - 1)
+            current_rows = []
+            current_start = None
     
     # Don't forget the last table if file doesn't end with empty row
-    if current_table_start is not None:
-        tables.append((current_table_start, len(df) - 1, current_table_name))
-    
-    return tables
+    if current_start is not None:
+        yield finish_table(current_start + len(current_rows) - 1)
+
+
+# Keywords that mark a header row
+HEADER_KEYWORD_RE = re.compile(r'metric|name|portfolio|asset|year|allocation|month')
 
+# Table type keywords in the header row, checked in priority order
+TABLE_TYPE_PATTERNS = [
+    ('allocation', re.compile(r'allocation')),
+    ('metrics', re.compile(r'metric|performance')),
+    ('returns', re.compile(r'return|year')),
+    ('correlation', re.compile(r'correlation')),
+]
 
-def detect_table_structure(df_subset):
+
+def detect_table_structure(values, notna_mask):
     """
     Detect the structure of a table subset (header row, data rows).
     
     Args:
-        df_subset: DataFrame slice containing a single table
+        values: Object array holding a single table
+        notna_mask: Boolean array marking the non-NaN cells of values
         
     Returns:
         Dictionary with 'header_row', 'data_start_row', 'num_columns'
@@ -108,82 +200,84 @@ def detect_table_structure(df_subset):
     
     # Look for a row that looks like a header
     # Headers typically have multiple non-NaN values and text content
-    for idx in range(len(df_subset)):
-        row = df_subset.iloc[idx]
-        non_nan_count = row.notna().sum()
-        
-        if non_nan_count >= 2:  # Potential header with at least 2 columns
-            # Check if this looks like a header row
-            # Headers often contain strings like "Metric", "Name", "Portfolio", etc.
-            row_values = [str(v).lower() for v in row.dropna() if pd.notna(v)]
-            header_keywords = ['metric', 'name', 'portfolio', 'asset', 'year', 'allocation', 'month']
-            
-            if any(keyword in ' '.join(row_values) for keyword in header_keywords):
-                structure['header_row'] = idx
-                structure['data_start_row'] = idx + 1
-                structure['num_columns'] = non_nan_count
-                break
-    
+    # like "Metric", "Name", "Portfolio", etc.
+    notna_counts = notna_mask.sum(axis=1)
+
+    def row_text(i):
+        # Lowercased text of the row's non-NaN cells
+        return ' '.join([str(v).lower() for v in values[i][notna_mask[i]]])
+
+    # First row with at least 2 columns and a header keyword
+    header_text = None
+    for i in np.flatnonzero(notna_counts >= 2):
+        text = row_text(i)
+        if HEADER_KEYWORD_RE.search(text):
+            header_text = text
+            structure['header_row'] = int(i)
+            structure['data_start_row'] = int(i) + 1
+            structure['num_columns'] = int(notna_counts[i])
+            break
+
     # If no explicit header found, assume first row is header
-    if structure['header_row'] is None and len(df_subset) > 0:
-        first_row = df_subset.iloc[0]
+    if structure['header_row'] is None and len(values) > 0:
+        header_text = row_text(0)
         structure['header_row'] = 0
         structure['data_start_row'] = 1
-        structure['num_columns'] = first_row.notna().sum()
+        structure['num_columns'] = int(notna_counts[0])
     
-    # Detect table type based on content
-    if structure['header_row'] is not None:
-        header_text = ' '.join([str(v).lower() for v in df_subset.iloc[structure['header_row']].dropna()])
-        
-        if 'allocation' in header_text:
-            structure['table_type'] = 'allocation'
-        elif 'metric' in header_text or 'performance' in header_text:
-            structure['table_type'] = 'metrics'
-        elif 'return' in header_text or 'year' in header_text:
-            structure['table_type'] = 'returns'
-        elif 'correlation' in header_text:
-            structure['table_type'] = 'correlation'
+    # Detect table type based on content (first matching type wins)
+    if header_text is not None:
+        for table_type, pattern in TABLE_TYPE_PATTERNS:
+            if pattern.search(header_text):
+                structure['table_type'] = table_type
+                break
     
     return structure
 
 
-def parse_key_value_table(df_subset, table_name):
+def parse_key_value_table(values, notna_mask, table_name):
     """
     Parse a simple key-value table (e.g., metadata like "Start Date", "End Date").
     
     Args:
-        df_subset: DataFrame slice containing the table
+        values: Object array holding the table
+        notna_mask: Boolean array marking the non-NaN cells of values
         table_name: Name of the table
         
     Returns:
         DataFrame with cleaned key-value pairs
     """
-    data_rows = []
-    
-    for idx in range(len(df_subset)):
-        row = df_subset.iloc[idx]
-        non_nan = row.dropna()
-        
-        if len(non_nan) >= 2:
-            # Key-value pair
-            key = non_nan.iloc[0]
-            value = non_nan.iloc[1]
-            data_rows.append({'Key': key, 'Value': value})
-        elif len(non_nan) == 1:
-            # Single value (could be section header)
-            data_rows.append({'Key': non_nan.iloc[0], 'Value': None})
-    
-    if data_rows:
-        return pd.DataFrame(data_rows)
-    return pd.DataFrame()
+    counts = notna_mask.sum(axis=1)
+
+    # Skip rows with no values at all
+    keep = counts >= 1
+    if not keep.any():
+        return pd.DataFrame()
+    if not keep.all():
+        values, notna_mask, counts = values[keep], notna_mask[keep], counts[keep]
+
+    # Move the non-NaN entries of every row to the front (stable keeps their order)
+    order = np.argsort(~notna_mask, axis=1, kind='stable')[:, :2]
+    leading = np.take_along_axis(values, order, axis=1)
 
+    # Rows with 2+ values are key-value pairs; single values (could be
+    # section headers) get no value
+    keys = leading[:, 0]
+    if leading.shape[1] >= 2:
+        vals = np.where(counts >= 2, leading[:, 1], None)
+    else:
+        vals = np.full(len(keys), None, dtype=object)
 
-def parse_tabular_data(df_subset, structure):
+    return pd.DataFrame({'Key': keys, 'Value': vals}).infer_objects()
+
+
+def parse_tabular_data(values, notna_mask, structure):
     """
     Parse a structured table with headers and data rows.
     
     Args:
-        df_subset: DataFrame slice containing the table
+        values: Object array holding the table
+        notna_mask: Boolean array marking the non-NaN cells of values
         structure: Structure dictionary from detect_table_structure
         
     Returns:
@@ -192,41 +286,54 @@ def parse_tabular_data(df_subset, structure):
     if structure['header_row'] is None:
         return pd.DataFrame()
     
-    # Extract header
-    header_row = df_subset.iloc[structure['header_row']]
-    columns = []
-    
-    for i, val in enumerate(header_row):
-        if pd.notna(val):
-            columns.append(str(val))
-        else:
-            # For NaN columns, use generic name
-            columns.append(f'Column_{i}')
-    
-    # Extract data rows
+    # Extract header, using generic names for NaN columns
+    header_row = structure['header_row']
+    columns = [
+        str(val) if is_set else f'Column_{i}'
+        for i, (val, is_set) in enumerate(zip(values[header_row], notna_mask[header_row]))
+    ]
+
+    # Keep only data rows and columns with at least one non-NaN value,
+    # selected in one pass from the NaN mask instead of two dropna scans
     data_start = structure['data_start_row']
-    data_rows = []
-    
-    for idx in range(data_start, len(df_subset)):
-        row = df_subset.iloc[idx]
-        # Only include rows with at least one non-NaN value
-        if row.notna().any():
-            # Take only as many values as we have columns
-            row_data = row.iloc[:len(columns)].tolist()
-            data_rows.append(row_data)
-    
-    if data_rows:
-        df_result = pd.DataFrame(data_rows, columns=columns)
-        # Remove columns that are entirely NaN
-        df_result = df_result.dropna(axis=1, how='all')
-        # Remove rows that are entirely NaN
-        df_result = df_result.dropna(axis=0, how='all')
-        return df_result
+    data_mask = notna_mask[data_start:]
+    row_any = data_mask.any(axis=1)
+    
+    if row_any.any():
+        col_any = data_mask[row_any].any(axis=0)
+        data = values[data_start:][row_any][:, col_any]
+        kept_columns = [col for col, keep in zip(columns, col_any) if keep]
+        return pd.DataFrame(data, columns=kept_columns).infer_objects()
     
     return pd.DataFrame()
 
 
-def parse_all_tables(file_path, sheet_name='Asset Allocation Report'):
+def table_cache_path(file_path, sheet_name, cache_dir=TABLE_CACHE_DIR):
+    """
+    Get the cache file path for a parsed workbook sheet.
+    
+    The cache key is content-addressed on the file's absolute path,
+    modification time and size, so editing or replacing the workbook
+    invalidates its entry.
+    
+    Args:
+        file_path: Path to the Excel file
+        sheet_name: Name of the parsed sheet
+        cache_dir: Directory holding cached tables
+        
+    Returns:
+        Path to the cache file (may not exist yet)
+    """
+    stat = os.stat(file_path)
+    key_source = (
+        f"{os.path.abspath(file_path)}:{stat.st_mtime_ns}:{stat.st_size}:"
+        f"{sheet_name}:{TABLE_CACHE_VERSION}"
+    )
+    key = hashlib.blake2b(key_source.encode(), digest_size=16).hexdigest()
+    return Path(cache_dir) / f"{key}.pkl"
+
+
+def parse_all_tables(file_path, sheet_name='Asset Allocation Report', cache_dir=TABLE_CACHE_DIR, verbose=False):
     """
     Parse all tables from an Excel file and return them as a dictionary of DataFrames.
     
@@ -235,28 +342,44 @@ def parse_all_tables(file_path, sheet_name='Asset Allocation Report'):
     Args:
         file_path: Path to the Excel file
         sheet_name: Name of the sheet to parse (default: 'Asset Allocation Report')
+        cache_dir: Directory for cached parse results (default: data/.cache).
+                   Pass None to always re-parse the Excel file.
+        verbose: If True, print per-table details as well as the summary
         
     Returns:
         Dictionary where keys are table names and values are parsed DataFrames
     """
-    # Load the raw Excel data without headers
-    df_raw = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-    
-    # Identify all table boundaries
-    table_boundaries = identify_table_boundaries(df_raw)
-    
-    print(f"Found {len(table_boundaries)} tables in the Excel file")
-    print("-" * 80)
-    
-    # Parse each table
+    # Reuse a previous parse of this exact file if one is cached. Tables are
+    # pickled rather than written as Parquet because they can have duplicate
+    # column names and mixed str/float columns.
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = table_cache_path(file_path, sheet_name, cache_dir)
+        if cache_path.exists():
+            parsed_tables = pd.read_pickle(cache_path)
+            print(f"Loaded {len(parsed_tables)} tables from cache: {cache_path}")
+            return parsed_tables
+    
+    # Per-table details are buffered and written once, and only when verbose
+    out = io.StringIO() if verbose else None
+    if verbose:
+        out.write("-" * 80 + "\n")
+    
+    # Stream the sheet and parse each table as it is read
     parsed_tables = {}
+    table_num = 0
     
-    for table_num, (start_row, end_row, raw_table_name) in enumerate(table_boundaries, 1):
-        # Extract the table subset
-        df_subset = df_raw.iloc[start_row:end_row+1].reset_index(drop=True)
+    for table_num, (start_row, end_row, values) in enumerate(iter_sheet_tables(file_path, sheet_name), 1):
+        # Naming, structure detection and parsing all work from the same
+        # values and NaN mask
+        notna_mask = pd.notna(values)
+        
+        # Table name is the first non-NaN value in the table's first row
+        first_row = values[0][notna_mask[0]]
+        raw_table_name = str(first_row[0]) if len(first_row) else f"Table_{table_num}"
         
         # Detect table structure
-        structure = detect_table_structure(df_subset)
+        structure = detect_table_structure(values, notna_mask)
         
         # Clean up table name
         table_name = raw_table_name.strip()
@@ -265,28 +388,43 @@ def parse_all_tables(file_path, sheet_name='Asset Allocation Report'):
         if table_name in parsed_tables:
             table_name = f"{table_name}_{table_num}"
         
-        print(f"\nTable {table_num}: {table_name}")
-        print(f"  Rows: {start_row} to {end_row} ({end_row - start_row + 1} rows)")
-        print(f"  Type: {structure['table_type']}")
-        print(f"  Columns: {structure['num_columns']}")
+        if verbose:
+            out.write(f"\nTable {table_num}: {table_name}\n")
+            out.write(f"  Rows: {start_row} to {end_row} ({end_row - start_row + 1} rows)\n")
+            out.write(f"  Type: {structure['table_type']}\n")
+            out.write(f"  Columns: {structure['num_columns']}\n")
         
         # Parse based on structure
         if structure['num_columns'] <= 2 and structure['table_type'] == 'unknown':
             # Likely a key-value table
-            parsed_df = parse_key_value_table(df_subset, table_name)
+            parsed_df = parse_key_value_table(values, notna_mask, table_name)
             if not parsed_df.empty:
                 parsed_tables[table_name] = parsed_df
-                print(f"  Parsed as: Key-Value table ({len(parsed_df)} entries)")
+                if verbose:
+                    out.write(f"  Parsed as: Key-Value table ({len(parsed_df)} entries)\n")
         else:
             # Structured tabular data
-            parsed_df = parse_tabular_data(df_subset, structure)
+            parsed_df = parse_tabular_data(values, notna_mask, structure)
             if not parsed_df.empty:
                 parsed_tables[table_name] = parsed_df
-                print(f"  Parsed as: Tabular data ({len(parsed_df)} rows x {len(parsed_df.columns)} cols)")
-    
-    print("\n" + "=" * 80)
-    print(f"Successfully parsed {len(parsed_tables)} tables")
-    print("=" * 80)
+                if verbose:
+                    out.write(f"  Parsed as: Tabular data ({len(parsed_df)} rows x {len(parsed_df.columns)} cols)\n")
+    
+    if verbose:
+        out.write("\n" + "=" * 80 + "\n")
+        out.write(f"Found {table_num} tables in the Excel file\n")
+        out.write(f"Successfully parsed {len(parsed_tables)} tables\n")
+        out.write("=" * 80)
+        print(out.getvalue())
+    else:
+        print(f"Parsed {len(parsed_tables)} of {table_num} tables from {file_path}")
+    
+    if cache_path is not None:
+        # Write to a temp file first so concurrent readers never see a partial file
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        pd.to_pickle(parsed_tables, tmp_path)
+        os.replace(tmp_path, cache_path)
     
     return parsed_tables
 
@@ -299,23 +437,26 @@ def display_parsed_tables(tables_dict, max_rows=10):
         tables_dict: Dictionary of parsed tables from parse_all_tables
         max_rows: Maximum number of rows to display per table
     """
-    print("\n" + "=" * 80)
-    print("PARSED TABLES SUMMARY")
-    print("=" * 80)
+    # Build the whole summary in memory and write it in one go
+    out = io.StringIO()
+    out.write("\n" + "=" * 80 + "\n")
+    out.write("PARSED TABLES SUMMARY\n")
+    out.write("=" * 80 + "\n")
     
     for table_name, df in tables_dict.items():
-        print(f"\n{'='*80}")
-        print(f"TABLE: {table_name}")
-        print(f"{'='*80}")
-        print(f"Shape: {df.shape[0]} rows × {df.shape[1]} columns")
-        print(f"Columns: {list(df.columns)}")
-        print(f"\nFirst {min(max_rows, len(df))} rows:")
-        print(df.head(max_rows).to_string(index=False))
+        out.write(f"\n{'='*80}\n")
+        out.write(f"TABLE: {table_name}\n")
+        out.write(f"{'='*80}\n")
+        out.write(f"Shape: {df.shape[0]} rows × {df.shape[1]} columns\n")
+        out.write(f"Columns: {list(df.columns)}\n")
+        out.write(f"\nFirst {min(max_rows, len(df))} rows:\n")
+        out.write(df.head(max_rows).to_string(index=False) + "\n")
         
         if len(df) > max_rows:
-            print(f"\n... ({len(df) - max_rows} more rows)")
+            out.write(f"\n... ({len(df) - max_rows} more rows)\n")
     
-    print("\n" + "=" * 80)
+    out.write("\n" + "=" * 80)
+    print(out.getvalue())
 
 
 # ============================================================================
@@ -347,14 +488,14 @@ def main(results_file=None, allocations_file=None):
     print("=" * 80)
 
     # Parse all tables
-    all_tables = parse_all_tables(results_file)
+    all_tables = parse_all_tables(results_file, verbose=True)
 
     # Display summary of parsed tables (commented out to reduce output)
     # display_parsed_tables(all_tables, max_rows=15)
 
     # Load portfolio allocations from CSV
     try:
-        df_allocations = pd.read_csv(allocations_file)
+        df_allocations = load_allocations(allocations_file)
         print("✓ Loaded portfolio allocations")
         print(f"\nPortfolio Allocations:")
         print(df_allocations.to_string(index=False))
@@ -400,9 +541,27 @@ def main(results_file=None, allocations_file=None):
 # In[ ]:
 
 
+import secrets
 import uuid
 from datetime import datetime
 
+def load_allocations(allocations_csv_path):
+    """
+    Load a portfolio allocations CSV.
+    
+    Args:
+        allocations_csv_path: Path to the allocations CSV
+    
+    Returns:
+        DataFrame with one row per asset and one weight column per portfolio
+    """
+    return pd.read_csv(
+        allocations_csv_path,
+        engine=CSV_ENGINE,
+        dtype={'Asset_Description': str},
+    )
+
+
 def generate_portfolio_metadata(allocations_csv_path, portfolio_names=None):
     """
     Generate portfolio metadata table from allocations CSV.
@@ -417,35 +576,37 @@ def generate_portfolio_metadata(allocations_csv_path, portfolio_names=None):
         Dictionary mapping portfolio names to UUIDs
     """
     # Load allocations
-    df_alloc = pd.read_csv(allocations_csv_path)
+    df_alloc = load_allocations(allocations_csv_path)
     
     # Auto-detect portfolio columns if not provided
     if portfolio_names is None:
         portfolio_names = [col for col in df_alloc.columns if col.startswith('Portfolio_')]
     
-    metadata_rows = []
-    portfolio_uuid_map = {}  # Map portfolio names to UUIDs
-    
-    for portfolio_col in portfolio_names:
-        # Generate UUID for this portfolio
-        portfolio_uuid = str(uuid.uuid4())
-        portfolio_uuid_map[portfolio_col] = portfolio_uuid
-        
-        # Extract weights for this portfolio
-        for idx, row in df_alloc.iterrows():
-            asset_name = row['Asset_Description']
-            weight = row[portfolio_col]
-            
-            # Only include assets with non-zero weights
-            if pd.notna(weight) and weight > 0:
-                metadata_rows.append({
-                    'portfolio_uuid': portfolio_uuid,
-                    'portfolio_name': portfolio_col,  # Keep for reference
-                    'asset_name': asset_name,
-                    'portfolio_weight': weight / 100.0  # Convert to decimal
-                })
-    
-    df_metadata = pd.DataFrame(metadata_rows)
+    # Generate a random (version 4) UUID for each portfolio from one buffer of
+    # random bytes instead of one uuid4() call per portfolio
+    raw = secrets.token_bytes(16 * len(portfolio_names))
+    portfolio_uuid_map = {
+        portfolio_col: str(uuid.UUID(bytes=raw[i * 16:(i + 1) * 16], version=4))
+        for i, portfolio_col in enumerate(portfolio_names)
+    }
+
+    # One row per (portfolio, asset) pair, portfolio-major
+    df_long = df_alloc.melt(
+        id_vars=['Asset_Description'],
+        value_vars=portfolio_names,
+        var_name='portfolio_name',
+        value_name='portfolio_weight',
+    )
+
+    # Only include assets with non-zero weights
+    df_long = df_long[df_long['portfolio_weight'].notna() & df_long['portfolio_weight'].gt(0)]
+
+    df_metadata = pd.DataFrame({
+        'portfolio_uuid': df_long['portfolio_name'].map(portfolio_uuid_map).to_numpy(),
+        'portfolio_name': df_long['portfolio_name'].to_numpy(),  # Keep for reference
+        'asset_name': df_long['Asset_Description'].to_numpy(),
+        'portfolio_weight': df_long['portfolio_weight'].to_numpy(dtype=np.float64) / 100.0,  # Convert to decimal
+    })
     
     print(f"Generated metadata for {len(portfolio_names)} portfolios")
     print(f"Total rows: {len(df_metadata)}")
@@ -456,6 +617,28 @@ def generate_portfolio_metadata(allocations_csv_path, portfolio_names=None):
     return df_metadata, portfolio_uuid_map
 
 
+def classify_portfolio_column(col):
+    """
+    Map a Portfolio Visualizer column name to a portfolio key.
+    
+    Matches 'Sample Portfolio' -> 'Portfolio_1', 'Portfolio 2' -> 'Portfolio_2', etc.
+    
+    Args:
+        col: Column name from a parsed metrics table
+        
+    Returns:
+        Portfolio key (e.g., 'Portfolio_1'), or None if the column doesn't match
+    """
+    col_lower = col.lower()
+    if 'sample' in col_lower:
+        return 'Portfolio_1'
+    if 'portfolio 2' in col_lower:
+        return 'Portfolio_2'
+    if 'portfolio 3' in col_lower:
+        return 'Portfolio_3'
+    return None
+
+
 def extract_performance_metrics_long(all_tables, portfolio_uuid_map):
     """
     Extract performance metrics and convert to long format.
@@ -467,7 +650,7 @@ def extract_performance_metrics_long(all_tables, portfolio_uuid_map):
     Returns:
         DataFrame with columns: portfolio_uuid | metric_name | metric_value
     """
-    metrics_rows = []
+    metric_frames = []
     
     # Define which tables to extract metrics from
     target_tables = [
@@ -485,41 +668,51 @@ def extract_performance_metrics_long(all_tables, portfolio_uuid_map):
         # The first column should be the metric name
         metric_col = df_table.columns[0]
         
-        # Iterate through each portfolio column
+        # Map each portfolio column to its key once per table
+        col_to_key = {}
         for col in df_table.columns[1:]:
-            # Map column name to UUID
-            # Try to match 'Sample Portfolio' -> 'Portfolio_1', 'Portfolio 2' -> 'Portfolio_2', etc.
-            portfolio_key = None
-            
-            if 'sample' in col.lower() or col == 'Sample Portfolio':
-                portfolio_key = 'Portfolio_1'
-            elif 'portfolio 2' in col.lower() or col == 'Portfolio 2':
-                portfolio_key = 'Portfolio_2'
-            elif 'portfolio 3' in col.lower() or col == 'Portfolio 3':
-                portfolio_key = 'Portfolio_3'
+            portfolio_key = classify_portfolio_column(col)
             
             if portfolio_key not in portfolio_uuid_map:
                 print(f"Warning: Could not map column '{col}' to a portfolio UUID")
                 continue
             
-            portfolio_uuid = portfolio_uuid_map[portfolio_key]
-            
-            # Extract metrics for this portfolio
-            for idx, row in df_table.iterrows():
-                metric_name = row[metric_col]
-                metric_value = row[col]
-                
-                # Only include valid numeric metrics
-                if pd.notna(metric_value) and isinstance(metric_value, (int, float)):
-                    metrics_rows.append({
-                        'portfolio_uuid': portfolio_uuid,
-                        'portfolio_name': portfolio_key,  # Keep for reference
-                        'metric_name': str(metric_name),
-                        'metric_value': float(metric_value),
-                        'table_source': table_name
-                    })
-    
-    df_metrics = pd.DataFrame(metrics_rows)
+            col_to_key[col] = portfolio_key
+        
+        if not col_to_key:
+            continue
+        
+        # Coerce the portfolio block to numbers in bulk (non-numeric cells
+        # become NaN), then reshape to one row per (metric, portfolio column)
+        # and keep only valid numeric metrics
+        numeric_block = df_table[list(col_to_key)].apply(pd.to_numeric, errors='coerce')
+        numeric_block.insert(0, metric_col, df_table[metric_col].astype(str))
+        df_long = numeric_block.melt(
+            id_vars=metric_col,
+            var_name='portfolio_col',
+            value_name='metric_value',
+        ).dropna(subset=['metric_value'])
+        
+        portfolio_keys = df_long['portfolio_col'].map(col_to_key)
+        metric_frames.append(pd.DataFrame({
+            'portfolio_uuid': portfolio_keys.map(portfolio_uuid_map).to_numpy(),
+            'portfolio_name': portfolio_keys.to_numpy(),  # Keep for reference
+            'metric_name': df_long[metric_col].to_numpy(),
+            'metric_value': df_long['metric_value'].to_numpy(dtype=np.float64),
+            'table_source': table_name,
+        }))
+    
+    if not metric_frames:
+        print("\nExtracted 0 metric values")
+        return pd.DataFrame(columns=[
+            'portfolio_uuid', 'portfolio_name', 'metric_name', 'metric_value', 'table_source'
+        ])
+    
+    df_metrics = pd.concat(metric_frames, ignore_index=True)
+    
+    # Few distinct values repeat across every row, so store them as categories
+    for col in ['portfolio_uuid', 'metric_name', 'table_source']:
+        df_metrics[col] = df_metrics[col].astype('category')
     
     print(f"\nExtracted {len(df_metrics)} metric values")
     print(f"Unique metrics: {df_metrics['metric_name'].nunique()}")
@@ -5,21 +5,57 @@ Consolidate Batch Backtest Results
 Combines multiple batch backtest Excel files into unified metadata and metrics tables.
 """
 
+import numpy as np
 import pandas as pd
 import os
 import sys
 import uuid
-import glob
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+# Make the project's parsing module importable regardless of working directory
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from backtest_analysis_processor_working import parse_all_tables as parse_tables
 
-def parse_all_tables(file_path, sheet_name="Asset Allocation Report"):
-    """Parse all tables from Excel file (imported from backtest_analysis_processor)."""
-    # Import the parsing function
-    sys.path.insert(0, ".")
-    from backtest_analysis_processor_working import parse_all_tables as parse_tables
+# Parquet copies of the outputs are written only when pyarrow is installed
+try:
+    import pyarrow
 
-    return parse_tables(file_path, sheet_name)
+    PARQUET_ENGINE = "pyarrow"
+except ImportError:
+    PARQUET_ENGINE = None
+
+# Portfolio UUIDs are uuid5(PORTFOLIO_UUID_NAMESPACE, portfolio name), so the
+# same portfolio gets the same UUID in every batch, process and rerun
+PORTFOLIO_UUID_NAMESPACE = uuid.UUID("17b56d60-f7dd-541e-9b56-c744a816926f")
+
+# Label columns that repeat across many rows of the consolidated tables
+CATEGORY_COLUMNS = [
+    "portfolio_uuid",
+    "portfolio_name",
+    "asset_name",
+    "metric_name",
+    "table_source",
+]
+
+
+def get_batch_portfolio_cols(df_batch):
+    """
+    Get the portfolio columns of a batch allocations table.
+
+    Args:
+        df_batch: Batch allocations DataFrame
+
+    Returns:
+        List of Grid_*, Portfolio_* and TreasuryGrid_* column names
+    """
+    return [
+        col
+        for col in df_batch.columns
+        if col.startswith("Grid_")
+        or col.startswith("Portfolio_")
+        or col.startswith("TreasuryGrid_")
+    ]
 
 
 def extract_portfolio_names_from_batch(all_tables):
@@ -45,81 +81,94 @@ def extract_portfolio_names_from_batch(all_tables):
     return []
 
 
-def generate_batch_metadata(batch_results_file, batch_file, portfolio_uuid_map):
+def generate_batch_metadata(df_batch, portfolio_cols, portfolio_uuid_map):
     """
     Generate metadata for a batch of portfolios.
 
     Args:
-        batch_results_file: Path to batch backtest results Excel
-        batch_file: Path to batch allocations CSV
+        df_batch: Batch allocations DataFrame
+        portfolio_cols: Portfolio columns of df_batch
         portfolio_uuid_map: Existing UUID map to extend
 
     Returns:
         DataFrame with metadata rows
         Updated UUID map
     """
-    # Load batch allocations
-    df_batch = pd.read_csv(batch_file)
+    # Record the (deterministic) UUID of any portfolio not seen in an earlier batch
+    portfolio_uuid_map.update(
+        {
+            portfolio_col: str(uuid.uuid5(PORTFOLIO_UUID_NAMESPACE, portfolio_col))
+            for portfolio_col in portfolio_cols
+            if portfolio_col not in portfolio_uuid_map
+        }
+    )
 
-    # Get portfolio columns from this batch
-    portfolio_cols = [
-        col
-        for col in df_batch.columns
-        if col.startswith("Grid_")
-        or col.startswith("Portfolio_")
-        or col.startswith("TreasuryGrid_")
+    # One row per (portfolio, asset) pair, portfolio-major
+    df_long = df_batch.melt(
+        id_vars=["Asset_Description"],
+        value_vars=portfolio_cols,
+        var_name="portfolio_name",
+        value_name="portfolio_weight",
+    )
+
+    # Only include assets with non-zero weights
+    df_long = df_long[
+        df_long["portfolio_weight"].notna() & df_long["portfolio_weight"].gt(0)
     ]
 
-    metadata_rows = []
+    portfolio_names = df_long["portfolio_name"]
+    df_metadata = pd.DataFrame(
+        {
+            "portfolio_uuid": portfolio_names.map(portfolio_uuid_map).to_numpy(),
+            "portfolio_name": portfolio_names.to_numpy(),
+            "asset_name": df_long["Asset_Description"].to_numpy(),
+            # Convert to decimal; float32 keeps ~7 significant digits, ample
+            # for weights in [0, 1]
+            "portfolio_weight": (
+                df_long["portfolio_weight"].to_numpy(float) / 100.0
+            ).astype(np.float32),
+        }
+    )
+
+    return df_metadata, portfolio_uuid_map
+
+
+def numeric_metric_values(column):
+    """
+    Get the numeric values of a metric column as floats.
 
-    for i, portfolio_col in enumerate(portfolio_cols, start=1):
-        # Check if we already have a UUID for this portfolio
-        if portfolio_col not in portfolio_uuid_map:
-            portfolio_uuid_map[portfolio_col] = str(uuid.uuid4())
+    Numbers and numeric text are kept; anything else (other text, dates,
+    blanks) becomes NaN.
 
-        portfolio_uuid = portfolio_uuid_map[portfolio_col]
+    Args:
+        column: Portfolio column from a parsed results table
 
-        # Extract allocations for this portfolio
-        for _, row in df_batch.iterrows():
-            asset_name = row["Asset_Description"]
-            weight = row[portfolio_col]
+    Returns:
+        Float Series aligned with column
+    """
+    if pd.api.types.is_numeric_dtype(column):
+        return column.astype(float)
 
-            if pd.notna(weight) and weight > 0:
-                metadata_rows.append(
-                    {
-                        "portfolio_uuid": portfolio_uuid,
-                        "portfolio_name": portfolio_col,
-                        "asset_name": asset_name,
-                        "portfolio_weight": weight / 100.0,  # Convert to decimal
-                    }
-                )
+    if column.dtype == object or pd.api.types.is_string_dtype(column.dtype):
+        return pd.to_numeric(column, errors="coerce").astype(float)
 
-    return pd.DataFrame(metadata_rows), portfolio_uuid_map
+    # Date columns carry no metric values
+    return pd.Series(np.nan, index=column.index)
 
 
-def extract_batch_metrics(all_tables, batch_file, portfolio_uuid_map):
+def extract_batch_metrics(all_tables, batch_portfolio_cols, portfolio_uuid_map):
     """
     Extract performance metrics from a batch results file.
 
     Args:
         all_tables: Parsed tables from batch results
-        batch_file: Path to batch allocations CSV
+        batch_portfolio_cols: Portfolio columns of the batch allocations CSV
         portfolio_uuid_map: UUID mapping for portfolios
 
     Returns:
         DataFrame with metrics rows
     """
-    # Get portfolio column names from batch file
-    df_batch = pd.read_csv(batch_file)
-    batch_portfolio_cols = [
-        col
-        for col in df_batch.columns
-        if col.startswith("Grid_")
-        or col.startswith("Portfolio_")
-        or col.startswith("TreasuryGrid_")
-    ]
-
-    metrics_rows = []
+    metric_frames = []
 
     # Define target tables
     target_tables = [
@@ -139,8 +188,6 @@ def extract_batch_metrics(all_tables, batch_file, portfolio_uuid_map):
         actual_table_name = matching_tables[0]
         df_table = all_tables[actual_table_name]
 
-        metric_col = df_table.columns[0]
-
         # Map Portfolio Visualizer column names to our Grid names
         pv_to_grid_mapping = {}
         for i, grid_name in enumerate(batch_portfolio_cols):
@@ -149,8 +196,9 @@ def extract_batch_metrics(all_tables, batch_file, portfolio_uuid_map):
             else:
                 pv_to_grid_mapping[f"Portfolio {i+1}"] = grid_name
 
-        # Extract metrics for each portfolio column
-        for pv_col in df_table.columns[1:]:
+        # Resolve each portfolio column (by position) to its Grid name
+        mapped_cols = []
+        for pos, pv_col in enumerate(df_table.columns[1:], start=1):
             # Map PV column name to Grid name
             grid_name = None
             if pv_col in pv_to_grid_mapping:
@@ -165,33 +213,104 @@ def extract_batch_metrics(all_tables, batch_file, portfolio_uuid_map):
             if not grid_name or grid_name not in portfolio_uuid_map:
                 continue
 
-            portfolio_uuid = portfolio_uuid_map[grid_name]
+            mapped_cols.append((pos, grid_name))
 
-            # Extract metrics
-            for _, row in df_table.iterrows():
-                metric_name = row[metric_col]
-                metric_value = row[pv_col]
+        if not mapped_cols:
+            continue
+
+        # Keep only numeric cells, then reshape to one row per
+        # (portfolio column, metric) in column-major order
+        values = pd.DataFrame(
+            {
+                i: numeric_metric_values(df_table.iloc[:, pos])
+                for i, (pos, _) in enumerate(mapped_cols)
+            }
+        )
+        values.insert(
+            0, "metric_name", df_table.iloc[:, 0].to_numpy(dtype=object).astype(str)
+        )
+        df_long = values.melt(
+            id_vars="metric_name", var_name="col_index", value_name="metric_value"
+        ).dropna(subset=["metric_value"])
+
+        grid_names = df_long["col_index"].map(
+            {i: grid_name for i, (_, grid_name) in enumerate(mapped_cols)}
+        )
+        metric_frames.append(
+            pd.DataFrame(
+                {
+                    "portfolio_uuid": grid_names.map(portfolio_uuid_map).to_numpy(),
+                    "portfolio_name": grid_names.to_numpy(),
+                    "metric_name": df_long["metric_name"].to_numpy(),
+                    # float64: dollar metrics such as Final Balance need
+                    # more than float32's ~7 significant digits
+                    "metric_value": df_long["metric_value"].to_numpy(dtype=np.float64),
+                    "table_source": actual_table_name,
+                }
+            )
+        )
+
+    if not metric_frames:
+        return pd.DataFrame()
+
+    return pd.concat(metric_frames, ignore_index=True)
 
-                if pd.notna(metric_value) and isinstance(metric_value, (int, float)):
-                    metrics_rows.append(
-                        {
-                            "portfolio_uuid": portfolio_uuid,
-                            "portfolio_name": grid_name,
-                            "metric_name": str(metric_name),
-                            "metric_value": float(metric_value),
-                            "table_source": actual_table_name,
-                        }
-                    )
 
-    return pd.DataFrame(metrics_rows)
+def index_batch_files(batch_dir="data/batch_files"):
+    """
+    Map batch numbers to their allocation CSVs with one directory scan.
+
+    Matches batch_<NNN>_*.csv; if several files share a batch number, the
+    first one listed wins (as with glob).
 
+    Args:
+        batch_dir: Directory holding the batch CSVs
 
-def consolidate_all_batches(manifest_file="data/batch_files/batch_manifest.csv"):
+    Returns:
+        Dictionary mapping batch number to batch file path
+    """
+    batch_index = {}
+    for file_name in os.listdir(batch_dir):
+        parts = file_name.split("_")
+        if (
+            len(parts) > 2
+            and parts[0] == "batch"
+            and parts[1].isdigit()
+            and parts[1] == f"{int(parts[1]):03d}"
+            and file_name.endswith(".csv")
+        ):
+            batch_index.setdefault(int(parts[1]), os.path.join(batch_dir, file_name))
+    return batch_index
+
+
+def load_batch(results_file, batch_file):
+    """
+    Parse a batch's results workbook and load its allocations.
+
+    Runs in a worker process and only does the file I/O. UUIDs are added
+    later by generate_batch_metadata; they are derived from portfolio names,
+    so they do not depend on which process assigns them.
+
+    Args:
+        results_file: Path to batch backtest results Excel
+        batch_file: Path to batch allocations CSV
+
+    Returns:
+        Tuple of (all_tables, df_batch)
+    """
+    return parse_tables(results_file), pd.read_csv(batch_file)
+
+
+def consolidate_all_batches(
+    manifest_file="data/batch_files/batch_manifest.csv", max_workers=None
+):
     """
     Consolidate all batch results into unified tables.
 
     Args:
         manifest_file: Path to batch manifest CSV
+        max_workers: Number of processes parsing results files in parallel
+                     (default: one per CPU)
 
     Returns:
         Tuple of (metadata_df, metrics_df, uuid_map)
@@ -208,39 +327,48 @@ def consolidate_all_batches(manifest_file="data/batch_files/batch_manifest.csv")
     all_metrics = []
     portfolio_uuid_map = {}
 
-    # Process each batch
+    # Find corresponding batch file for each batch
+    batch_index = index_batch_files()
+    batches = []
     for _, row in df_manifest.iterrows():
         batch_num = row["batch_num"]
-        results_file = row["results_file"]
-
-        # Find corresponding batch file
-        batch_file = glob.glob(f"data/batch_files/batch_{batch_num:03d}_*.csv")[0]
+        batches.append((batch_num, row["results_file"], batch_index[batch_num]))
+
+    # Parse the batches in parallel, then process them in manifest order
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        loaded = executor.map(
+            load_batch,
+            [results_file for _, results_file, _ in batches],
+            [batch_file for _, _, batch_file in batches],
+        )
 
-        print(f"\nProcessing Batch {batch_num}...")
-        print(f"  Results: {results_file}")
-        print(f"  Allocations: {batch_file}")
+        for (batch_num, results_file, batch_file), (all_tables, df_batch) in zip(
+            batches, loaded
+        ):
+            print(f"\nProcessing Batch {batch_num}...")
+            print(f"  Results: {results_file}")
+            print(f"  Allocations: {batch_file}")
 
-        # Parse results
-        all_tables = parse_all_tables(results_file)
+            portfolio_cols = get_batch_portfolio_cols(df_batch)
 
-        # Generate metadata
-        batch_metadata, portfolio_uuid_map = generate_batch_metadata(
-            results_file, batch_file, portfolio_uuid_map
-        )
-        all_metadata.append(batch_metadata)
+            # Generate metadata
+            batch_metadata, portfolio_uuid_map = generate_batch_metadata(
+                df_batch, portfolio_cols, portfolio_uuid_map
+            )
+            all_metadata.append(batch_metadata)
 
-        # Extract metrics
-        batch_metrics = extract_batch_metrics(
-            all_tables, batch_file, portfolio_uuid_map
-        )
-        all_metrics.append(batch_metrics)
+            # Extract metrics
+            batch_metrics = extract_batch_metrics(
+                all_tables, portfolio_cols, portfolio_uuid_map
+            )
+            all_metrics.append(batch_metrics)
 
-        print(f"  ✓ Extracted {len(batch_metadata)} metadata rows")
-        print(f"  ✓ Extracted {len(batch_metrics)} metric rows")
+            print(f"  ✓ Extracted {len(batch_metadata)} metadata rows")
+            print(f"  ✓ Extracted {len(batch_metrics)} metric rows")
 
-    # Combine all batches
-    df_metadata = pd.concat(all_metadata, ignore_index=True)
-    df_metrics = pd.concat(all_metrics, ignore_index=True)
+    # Combine all batches, dictionary-encoding the repeated labels
+    df_metadata = categorize_labels(pd.concat(all_metadata, ignore_index=True))
+    df_metrics = categorize_labels(pd.concat(all_metrics, ignore_index=True))
 
     print("\n" + "=" * 80)
     print("CONSOLIDATION COMPLETE")
@@ -252,8 +380,41 @@ def consolidate_all_batches(manifest_file="data/batch_files/batch_manifest.csv")
     return df_metadata, df_metrics, portfolio_uuid_map
 
 
+def categorize_labels(df):
+    """
+    Convert the repeated label columns of a consolidated table to categories.
+
+    Args:
+        df: Consolidated metadata, metrics or UUID mapping DataFrame
+
+    Returns:
+        DataFrame with CATEGORY_COLUMNS stored as category dtype
+    """
+    return df.astype({col: "category" for col in CATEGORY_COLUMNS if col in df.columns})
+
+
+def save_parquet(df, csv_file):
+    """
+    Save a Parquet copy of a CSV output next to it, if pyarrow is available.
+
+    Repeated string columns are stored as categories (dictionary encoded).
+
+    Args:
+        df: DataFrame that was written to csv_file
+        csv_file: Path of the CSV output
+    """
+    if PARQUET_ENGINE is None:
+        return
+
+    parquet_file = os.path.splitext(csv_file)[0] + ".parquet"
+    categorize_labels(df).to_parquet(
+        parquet_file, engine=PARQUET_ENGINE, compression="zstd", index=False
+    )
+    print(f"  Parquet copy: {parquet_file}")
+
+
 def save_consolidated_results(df_metadata, df_metrics, uuid_map):
-    """Save consolidated results to CSV files."""
+    """Save consolidated results to CSV (and Parquet, with pyarrow) files."""
     output_dir = "data/generated_tables"
     os.makedirs(output_dir, exist_ok=True)
 
@@ -262,31 +423,40 @@ def save_consolidated_results(df_metadata, df_metrics, uuid_map):
     df_metadata.to_csv(metadata_file, index=False)
     print(f"\n✓ Saved metadata: {metadata_file}")
     print(f"  Rows: {len(df_metadata)}")
+    save_parquet(df_metadata, metadata_file)
 
     # Save metrics
     metrics_file = os.path.join(output_dir, "portfolio_performance_metrics.csv")
     df_metrics.to_csv(metrics_file, index=False)
     print(f"\n✓ Saved metrics: {metrics_file}")
     print(f"  Rows: {len(df_metrics)}")
+    save_parquet(df_metrics, metrics_file)
 
     # Save UUID mapping
     uuid_file = os.path.join(output_dir, "portfolio_uuid_mapping.csv")
     df_uuid_map = pd.DataFrame(
-        [{"portfolio_name": k, "portfolio_uuid": v} for k, v in uuid_map.items()]
+        {
+            "portfolio_name": list(uuid_map.keys()),
+            "portfolio_uuid": list(uuid_map.values()),
+        }
     )
     df_uuid_map.to_csv(uuid_file, index=False)
     print(f"\n✓ Saved UUID mapping: {uuid_file}")
     print(f"  Rows: {len(df_uuid_map)}")
+    save_parquet(df_uuid_map, uuid_file)
 
-    # Display top portfolios by Sharpe Ratio
-    df_sharpe = df_metrics[df_metrics["metric_name"] == "Sharpe Ratio"].copy()
-    df_sharpe = df_sharpe.sort_values("metric_value", ascending=False)
+    # Display top portfolios by Sharpe Ratio (partial selection, no full sort)
+    df_top = df_metrics.loc[
+        df_metrics["metric_name"] == "Sharpe Ratio", ["portfolio_name", "metric_value"]
+    ].nlargest(10, "metric_value")
 
     print("\n" + "=" * 80)
     print("TOP 10 PORTFOLIOS BY SHARPE RATIO")
     print("=" * 80)
-    for i, (_, row) in enumerate(df_sharpe.head(10).iterrows(), 1):
-        print(f"{i:2d}. {row['portfolio_name']:15s}: {row['metric_value']:.6f}")
+    for i, (portfolio_name, metric_value) in enumerate(
+        df_top.itertuples(index=False), 1
+    ):
+        print(f"{i:2d}. {portfolio_name:15s}: {metric_value:.6f}")
 
     print("\n" + "=" * 80)
 
@@ -301,11 +471,19 @@ if __name__ == "__main__":
         default="data/batch_files/batch_manifest.csv",
         help="Path to batch manifest file",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of parallel parsing processes (default: one per CPU)",
+    )
 
     args = parser.parse_args()
 
     # Consolidate results
-    df_metadata, df_metrics, uuid_map = consolidate_all_batches(args.manifest)
+    df_metadata, df_metrics, uuid_map = consolidate_all_batches(
+        args.manifest, max_workers=args.workers
+    )
 
     # Save consolidated results
     save_consolidated_results(df_metadata, df_metrics, uuid_map)
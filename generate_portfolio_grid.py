@@ -11,6 +11,81 @@ import numpy as np
 import itertools
 from pathlib import Path
 
+# Asset weight columns of every generated grid, in output order
+ASSET_COLUMNS = [
+    'US Equities',
+    'Foreign Developed Equities',
+    'Emerging Market Equities',
+    'US Treasuries',
+    'TIPS',
+    'Corporate Bonds',
+    'Real Estate/REIT',
+]
+
+
+# Minimum weight of any asset in a generated portfolio
+MIN_ALLOCATION = 0.03
+
+
+def build_grid(equity_splits, us_equity_ratios, intl_dev_ratios,
+               fi_treasury_ratios, fi_tips_ratios, reit_levels,
+               id_prefix, min_non_reit_equity=0.0):
+    """
+    Evaluate every combination of grid parameters and keep the valid portfolios.
+
+    All combinations are computed at once as NumPy arrays, in the same order
+    as nested loops over the parameters (the last one varying fastest).
+
+    Args:
+        equity_splits: Total equity as % of portfolio
+        us_equity_ratios: US as % of non-REIT equity
+        intl_dev_ratios: Intl Developed as % of non-REIT equity (Emerging is the remainder)
+        fi_treasury_ratios: Treasuries as % of total FI
+        fi_tips_ratios: TIPS as % of total FI (Corp bonds are the remainder)
+        reit_levels: REIT as % of portfolio
+        id_prefix: Prefix of the generated portfolio IDs
+        min_non_reit_equity: Minimum non-REIT equity as % of portfolio
+
+    Returns:
+        DataFrame with portfolio allocations
+    """
+    eq_split, us_ratio, intl_ratio, treas_ratio, tips_ratio, reit = (
+        grid.ravel() for grid in np.meshgrid(
+            equity_splits, us_equity_ratios, intl_dev_ratios,
+            fi_treasury_ratios, fi_tips_ratios, reit_levels,
+            indexing='ij',
+        )
+    )
+
+    # Equity breakdown (REIT is separate)
+    total_fi = 1.0 - eq_split
+    non_reit_equity = eq_split - reit
+
+    us_equities = non_reit_equity * us_ratio
+    intl_dev = non_reit_equity * intl_ratio
+    emerging = non_reit_equity * (1 - us_ratio - intl_ratio)
+
+    # Fixed income breakdown
+    treasuries = total_fi * treas_ratio
+    tips = total_fi * tips_ratio
+    corp_bonds = total_fi * (1 - treas_ratio - tips_ratio)
+
+    # Weights in ASSET_COLUMNS order
+    weights = np.column_stack([us_equities, intl_dev, emerging, treasuries, tips, corp_bonds, reit])
+    total = us_equities + intl_dev + emerging + treasuries + tips + corp_bonds + reit
+
+    # Every asset at the 3% minimum and the sum close to 1.0 (small rounding error)
+    valid = (
+        (non_reit_equity >= min_non_reit_equity)
+        & (weights >= MIN_ALLOCATION).all(axis=1)
+        & (np.abs(total - 1.0) < 0.001)
+    )
+
+    # Normalize to exactly 1.0
+    df = pd.DataFrame(weights[valid] / total[valid, np.newaxis], columns=ASSET_COLUMNS)
+    df.insert(0, 'portfolio_id', [f'{id_prefix}_{i:03d}' for i in range(1, len(df) + 1)])
+    return df
+
 
 def generate_coarse_grid():
     """
@@ -37,70 +112,12 @@ def generate_coarse_grid():
 
     reit_levels = [0.05, 0.075, 0.10]  # REIT as % of portfolio
 
-    portfolios = []
-    portfolio_id = 1
-
-    # Generate all combinations
-    for eq_split in equity_splits:
-        for us_ratio in us_equity_ratios:
-            for intl_ratio in intl_dev_ratios:
-                for treas_ratio in fi_treasury_ratios:
-                    for tips_ratio in fi_tips_ratios:
-                        for reit in reit_levels:
-                            # Calculate allocations
-                            total_equity = eq_split
-                            total_fi = 1.0 - total_equity
-
-                            # Equity breakdown (REIT is separate)
-                            non_reit_equity = total_equity - reit
-
-                            us_equities = non_reit_equity * us_ratio
-                            intl_dev = non_reit_equity * intl_ratio
-                            emerging = non_reit_equity * (1 - us_ratio - intl_ratio)
-
-                            # Skip if any allocation below 3% minimum
-                            MIN_ALLOCATION = 0.03
-                            if emerging < MIN_ALLOCATION:
-                                continue
-                            if us_equities < MIN_ALLOCATION or intl_dev < MIN_ALLOCATION:
-                                continue
-
-                            # Fixed income breakdown
-                            treasuries = total_fi * treas_ratio
-                            tips = total_fi * tips_ratio
-                            corp_bonds = total_fi * (1 - treas_ratio - tips_ratio)
-
-                            # Skip if any FI allocation below 3% minimum
-                            if corp_bonds < MIN_ALLOCATION or treasuries < MIN_ALLOCATION or tips < MIN_ALLOCATION:
-                                continue
-                            if reit < MIN_ALLOCATION:
-                                continue
-
-                            # Create portfolio
-                            portfolio = {
-                                'portfolio_id': f'Grid_{portfolio_id:03d}',
-                                'US Equities': us_equities,
-                                'Foreign Developed Equities': intl_dev,
-                                'Emerging Market Equities': emerging,
-                                'US Treasuries': treasuries,
-                                'TIPS': tips,
-                                'Corporate Bonds': corp_bonds,
-                                'Real Estate/REIT': reit,
-                            }
-
-                            # Verify sum is close to 1.0
-                            total = sum([v for k, v in portfolio.items() if k != 'portfolio_id'])
-                            if abs(total - 1.0) < 0.001:  # Allow small rounding error
-                                # Normalize to exactly 1.0
-                                for k in portfolio:
-                                    if k != 'portfolio_id':
-                                        portfolio[k] = portfolio[k] / total
-
-                                portfolios.append(portfolio)
-                                portfolio_id += 1
-
-    df = pd.DataFrame(portfolios)
-    return df
+    # Evaluate all combinations
+    return build_grid(
+        equity_splits, us_equity_ratios, intl_dev_ratios,
+        fi_treasury_ratios, fi_tips_ratios, reit_levels,
+        id_prefix='Grid',
+    )
 
 
 def generate_fine_grid():
@@ -122,64 +139,12 @@ def generate_fine_grid():
 
     reit_levels = [0.05, 0.075, 0.10, 0.15, 0.20]
 
-    portfolios = []
-    portfolio_id = 1
-
-    for eq_split in equity_splits:
-        for us_ratio in us_equity_ratios:
-            for intl_ratio in intl_dev_ratios:
-                for treas_ratio in fi_treasury_ratios:
-                    for tips_ratio in fi_tips_ratios:
-                        for reit in reit_levels:
-                            total_equity = eq_split
-                            total_fi = 1.0 - total_equity
-
-                            non_reit_equity = total_equity - reit
-
-                            # Skip if REIT allocation is too high for this equity level
-                            if non_reit_equity < 0.2:  # Minimum 20% in non-REIT equity
-                                continue
-
-                            us_equities = non_reit_equity * us_ratio
-                            intl_dev = non_reit_equity * intl_ratio
-                            emerging = non_reit_equity * (1 - us_ratio - intl_ratio)
-
-                            # Apply 3% minimum allocation constraint
-                            MIN_ALLOCATION = 0.03
-                            if emerging < MIN_ALLOCATION or us_equities < MIN_ALLOCATION or intl_dev < MIN_ALLOCATION:
-                                continue
-
-                            treasuries = total_fi * treas_ratio
-                            tips = total_fi * tips_ratio
-                            corp_bonds = total_fi * (1 - treas_ratio - tips_ratio)
-
-                            if corp_bonds < MIN_ALLOCATION or treasuries < MIN_ALLOCATION or tips < MIN_ALLOCATION:
-                                continue
-                            if reit < MIN_ALLOCATION:
-                                continue
-
-                            portfolio = {
-                                'portfolio_id': f'FineGrid_{portfolio_id:03d}',
-                                'US Equities': us_equities,
-                                'Foreign Developed Equities': intl_dev,
-                                'Emerging Market Equities': emerging,
-                                'US Treasuries': treasuries,
-                                'TIPS': tips,
-                                'Corporate Bonds': corp_bonds,
-                                'Real Estate/REIT': reit,
-                            }
-
-                            total = sum([v for k, v in portfolio.items() if k != 'portfolio_id'])
-                            if abs(total - 1.0) < 0.001:
-                                for k in portfolio:
-                                    if k != 'portfolio_id':
-                                        portfolio[k] = portfolio[k] / total
-
-                                portfolios.append(portfolio)
-                                portfolio_id += 1
-
-    df = pd.DataFrame(portfolios)
-    return df
+    return build_grid(
+        equity_splits, us_equity_ratios, intl_dev_ratios,
+        fi_treasury_ratios, fi_tips_ratios, reit_levels,
+        id_prefix='FineGrid',
+        min_non_reit_equity=0.2,  # Skip REIT levels too high for the equity level
+    )
 
 
 def generate_random_portfolios(n_portfolios=100, seed=42):
@@ -193,67 +158,37 @@ def generate_random_portfolios(n_portfolios=100, seed=42):
     Returns:
         DataFrame with portfolio allocations
     """
-    np.random.seed(seed)
-    portfolios = []
-    MIN_ALLOCATION = 0.03
-
-    attempts = 0
-    max_attempts = n_portfolios * 10  # Avoid infinite loop
-
-    while len(portfolios) < n_portfolios and attempts < max_attempts:
-        attempts += 1
-
-        # Random constraints
-        total_equity = np.random.uniform(0.40, 0.80)
-        reit = np.random.uniform(MIN_ALLOCATION, 0.20)
-        non_reit_equity = total_equity - reit
-
-        # Random equity split (using Dirichlet distribution for valid probabilities)
-        equity_weights = np.random.dirichlet([2, 1.5, 1])  # Favor US slightly
-        us_equities = non_reit_equity * equity_weights[0]
-        intl_dev = non_reit_equity * equity_weights[1]
-        emerging = non_reit_equity * equity_weights[2]
-
-        # Skip if any below minimum
-        if us_equities < MIN_ALLOCATION or intl_dev < MIN_ALLOCATION or emerging < MIN_ALLOCATION:
-            continue
-
-        # Random FI split
-        total_fi = 1.0 - total_equity
-        fi_weights = np.random.dirichlet([1.5, 1.5, 1])  # Equal-ish
-        treasuries = total_fi * fi_weights[0]
-        tips = total_fi * fi_weights[1]
-        corp_bonds = total_fi * fi_weights[2]
-
-        # Skip if any below minimum
-        if treasuries < MIN_ALLOCATION or tips < MIN_ALLOCATION or corp_bonds < MIN_ALLOCATION:
-            continue
-
-        portfolio = {
-            'portfolio_id': f'Random_{len(portfolios)+1:03d}',
-            'US Equities': us_equities,
-            'Foreign Developed Equities': intl_dev,
-            'Emerging Market Equities': emerging,
-            'US Treasuries': treasuries,
-            'TIPS': tips,
-            'Corporate Bonds': corp_bonds,
-            'Real Estate/REIT': reit,
-        }
-
-        # Normalize
-        total = sum([v for k, v in portfolio.items() if k != 'portfolio_id'])
-        for k in portfolio:
-            if k != 'portfolio_id':
-                portfolio[k] = portfolio[k] / total
-
-        # Final check after normalization
-        if all(portfolio[k] >= MIN_ALLOCATION for k in portfolio if k != 'portfolio_id'):
-            portfolios.append(portfolio)
-
-    if len(portfolios) < n_portfolios:
-        print(f"Warning: Only generated {len(portfolios)} valid portfolios out of {n_portfolios} requested")
-
-    df = pd.DataFrame(portfolios)
+    rng = np.random.default_rng(seed)
+    n_candidates = n_portfolios * 10  # Same attempt budget as one-at-a-time rejection
+
+    # Draw all candidates at once
+    total_equity = rng.uniform(0.40, 0.80, n_candidates)
+    reit = rng.uniform(MIN_ALLOCATION, 0.20, n_candidates)
+    non_reit_equity = total_equity - reit
+    total_fi = 1.0 - total_equity
+
+    # Random equity and FI splits (using Dirichlet distribution for valid probabilities)
+    equity_weights = rng.dirichlet([2, 1.5, 1], n_candidates)  # Favor US slightly
+    fi_weights = rng.dirichlet([1.5, 1.5, 1], n_candidates)  # Equal-ish
+
+    # Weights in ASSET_COLUMNS order
+    weights = np.column_stack([
+        non_reit_equity[:, np.newaxis] * equity_weights,
+        total_fi[:, np.newaxis] * fi_weights,
+        reit,
+    ])
+
+    # Skip candidates with any asset below minimum, before and after normalizing
+    valid = (weights >= MIN_ALLOCATION).all(axis=1)
+    weights = weights[valid]
+    weights /= weights.sum(axis=1, keepdims=True)
+    weights = weights[(weights >= MIN_ALLOCATION).all(axis=1)][:n_portfolios]
+
+    if len(weights) < n_portfolios:
+        print(f"Warning: Only generated {len(weights)} valid portfolios out of {n_portfolios} requested")
+
+    df = pd.DataFrame(weights, columns=ASSET_COLUMNS)
+    df.insert(0, 'portfolio_id', [f'Random_{i:03d}' for i in range(1, len(df) + 1)])
     return df
 
 
@@ -278,29 +213,24 @@ def save_grid_for_backtest(df, output_path='data/source_tables/portfolio_allocat
         'Real Estate/REIT': 'Real Estate/REITs - US REIT',
     }
 
-    # Create rows for each asset
-    rows = []
-    for i, (short_name, full_name) in enumerate(asset_mapping.items(), 1):
-        row = {
-            'Asset_Number': i,
-            'Asset_Description': full_name,
-        }
-
-        # Add each portfolio's allocation for this asset (as percentage)
-        for _, portfolio in df.iterrows():
-            portfolio_id = portfolio['portfolio_id']
-            row[portfolio_id] = portfolio[short_name] * 100  # Convert to percentage
-
-        rows.append(row)
-
-    df_output = pd.DataFrame(rows)
+    # One row per asset, one column per portfolio (as percentage)
+    df_output = (
+        df.set_index('portfolio_id')[list(asset_mapping)]
+        .mul(100)  # Convert to percentage
+        .T
+        .rename(index=asset_mapping)
+        .rename_axis(None, axis=1)
+    )
+    df_output.insert(0, 'Asset_Number', range(1, len(df_output) + 1))
+    df_output.insert(1, 'Asset_Description', df_output.index)
+    df_output = df_output.reset_index(drop=True)
 
     # Save
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     df_output.to_csv(output_path, index=False)
 
     print(f"✓ Saved {len(df)} portfolios to: {output_path}")
-    print(f"  Asset classes: {len(rows)}")
+    print(f"  Asset classes: {len(df_output)}")
     print(f"  Format: Ready for backtesting")
 
     return df_output
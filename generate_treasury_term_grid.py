@@ -44,151 +44,143 @@ TREASURY_OPTIONS = {
     'LongTreasury': 'Long Term Treasury'
 }
 
+# Every allocation is a multiple of 0.5%, so one decimal is exact
+CSV_FLOAT_FORMAT = '%.1f'
+CSV_BUFFER_SIZE = 1 << 20
+
+# Treasury maturities in split order
+TREASURY_COLUMNS = ['ShortTreasury', 'IntermediateTreasury', 'TreasuryNotes', 'LongTreasury']
+
+# Define asset classes in the order they'll be used
+ASSET_MAPPING = [
+    {
+        'Asset_Number': 1,
+        'Asset_Class_Option_Value': 'TotalStockMarket',
+        'Asset_Description': 'US Equities - US Stock Market',
+        'Category': 'Equity'
+    },
+    {
+        'Asset_Number': 2,
+        'Asset_Class_Option_Value': 'IntlDeveloped',
+        'Asset_Description': 'Foreign Developed Equities - Intl Developed ex-US Market',
+        'Category': 'Equity'
+    },
+    {
+        'Asset_Number': 3,
+        'Asset_Class_Option_Value': 'EmergingMarket',
+        'Asset_Description': 'Emerging Market Equities - Emerging Markets',
+        'Category': 'Equity'
+    },
+    {
+        'Asset_Number': 4,
+        'Asset_Class_Option_Value': 'ShortTreasury',
+        'Asset_Description': 'US Treasuries - Short Term Treasury',
+        'Category': 'Fixed Income'
+    },
+    {
+        'Asset_Number': 5,
+        'Asset_Class_Option_Value': 'IntermediateTreasury',
+        'Asset_Description': 'US Treasuries - Intermediate Term Treasury',
+        'Category': 'Fixed Income'
+    },
+    {
+        'Asset_Number': 6,
+        'Asset_Class_Option_Value': 'TreasuryNotes',
+        'Asset_Description': 'US Treasuries - 10-year Treasury',
+        'Category': 'Fixed Income'
+    },
+    {
+        'Asset_Number': 7,
+        'Asset_Class_Option_Value': 'LongTreasury',
+        'Asset_Description': 'US Treasuries - Long Term Treasury',
+        'Category': 'Fixed Income'
+    },
+    {
+        'Asset_Number': 8,
+        'Asset_Class_Option_Value': 'TIPS',
+        'Asset_Description': 'TIPS - Inflation-Protected Bonds',
+        'Category': 'Fixed Income'
+    },
+    {
+        'Asset_Number': 9,
+        'Asset_Class_Option_Value': 'CorpBond',
+        'Asset_Description': 'Corporate Bonds - Investment Grade Corporate Bonds',
+        'Category': 'Fixed Income'
+    },
+    {
+        'Asset_Number': 10,
+        'Asset_Class_Option_Value': 'REIT',
+        'Asset_Description': 'Real Estate/REITs - US REIT',
+        'Category': 'Alternative'
+    }
+]
+
+# Grid column for each asset row, computed once
+ASSET_ORDER = [asset['Asset_Class_Option_Value'] for asset in ASSET_MAPPING]
+
+def generate_treasury_split_matrix():
+    """
+    Generate all treasury splits that sum to 25% as one integer array
+    Using increments of 5% with minimum 0% per maturity; one row per split,
+    columns in TREASURY_COLUMNS order
+    """
+    # Every combination of 0, 5, ..., 25 across the four maturities, in the
+    # same order as nested loops (long varying fastest)
+    increments = np.arange(0, int(TOTAL_TREASURY) + 1, 5, dtype=np.int8)
+    grid = np.stack(np.meshgrid(*[increments] * len(TREASURY_COLUMNS), indexing='ij'), axis=-1)
+    grid = grid.reshape(-1, len(TREASURY_COLUMNS))
+
+    return grid[grid.sum(axis=1) == TOTAL_TREASURY]
+
 def generate_treasury_splits():
     """
     Generate combinations of treasury allocations that sum to 25%
     Using increments of 5% with minimum 0% per maturity
     """
-    splits = []
-
-    # Generate all combinations that sum to 25%
-    # Using 5% increments: 0, 5, 10, 15, 20, 25
-    increments = [0, 5, 10, 15, 20, 25]
-
-    for short in increments:
-        for intermediate in increments:
-            for ten_year in increments:
-                for long in increments:
-                    if short + intermediate + ten_year + long == TOTAL_TREASURY:
-                        # Only include if at least one treasury type is used
-                        if max(short, intermediate, ten_year, long) > 0:
-                            splits.append({
-                                'ShortTreasury': short,
-                                'IntermediateTreasury': intermediate,
-                                'TreasuryNotes': ten_year,
-                                'LongTreasury': long
-                            })
-
-    return splits
+    return [dict(zip(TREASURY_COLUMNS, row)) for row in generate_treasury_split_matrix().tolist()]
 
 def create_portfolio_grid():
     """Create the portfolio grid with treasury term structure variations"""
 
-    treasury_splits = generate_treasury_splits()
+    treasury_splits = generate_treasury_split_matrix()
 
     print(f"Generated {len(treasury_splits)} treasury term structure combinations")
     print(f"\nSample combinations:")
-    for i, split in enumerate(treasury_splits[:5]):
-        print(f"  {i+1}. Short: {split['ShortTreasury']}%, Int: {split['IntermediateTreasury']}%, "
-              f"10yr: {split['TreasuryNotes']}%, Long: {split['LongTreasury']}%")
-
-    # Create portfolio configurations
-    portfolios = []
-
-    for idx, treasury_split in enumerate(treasury_splits, start=1):
-        portfolio = {
-            'Grid_ID': f'TreasuryGrid_{idx:03d}',
-            'TotalStockMarket': BASE_ALLOCATION['TotalStockMarket'],
-            'IntlDeveloped': BASE_ALLOCATION['IntlDeveloped'],
-            'EmergingMarket': BASE_ALLOCATION['EmergingMarket'],
-            'ShortTreasury': treasury_split['ShortTreasury'],
-            'IntermediateTreasury': treasury_split['IntermediateTreasury'],
-            'TreasuryNotes': treasury_split['TreasuryNotes'],
-            'LongTreasury': treasury_split['LongTreasury'],
-            'TIPS': BASE_ALLOCATION['TIPS'],
-            'CorpBond': BASE_ALLOCATION['CorpBond'],
-            'REIT': BASE_ALLOCATION['REIT']
-        }
-
-        # Verify sum equals 100%
-        total = sum([v for k, v in portfolio.items() if k != 'Grid_ID'])
-        assert abs(total - 100.0) < 0.01, f"Portfolio {portfolio['Grid_ID']} sums to {total}%"
-
-        portfolios.append(portfolio)
-
-    return pd.DataFrame(portfolios)
+    for i, (short, intermediate, ten_year, long) in enumerate(treasury_splits[:5].tolist()):
+        print(f"  {i+1}. Short: {short}%, Int: {intermediate}%, "
+              f"10yr: {ten_year}%, Long: {long}%")
+
+    # Create portfolio configurations: constant base assets broadcast down
+    # each column, treasury columns straight from the split matrix
+    n_portfolios = len(treasury_splits)
+    # Allocations are small multiples of 0.5%, so int8 treasury columns and
+    # float32 base columns hold them exactly at a fraction of the footprint
+    columns = dict(zip(TREASURY_COLUMNS, treasury_splits.T))
+    columns.update({asset: np.full(n_portfolios, weight, dtype=np.float32)
+                    for asset, weight in BASE_ALLOCATION.items()})
+
+    grid_df = pd.DataFrame({
+        'Grid_ID': [f'TreasuryGrid_{idx:03d}' for idx in range(1, n_portfolios + 1)],
+        **{asset: columns[asset] for asset in ASSET_ORDER}
+    })
+
+    # Verify every portfolio sums to 100%
+    totals = grid_df.drop(columns='Grid_ID').sum(axis=1)
+    bad = np.abs(totals - 100.0) >= 0.01
+    assert not bad.any(), f"Portfolio {grid_df['Grid_ID'][bad].iloc[0]} sums to {totals[bad].iloc[0]}%"
+
+    return grid_df
 
 def create_asset_mapping_table(grid_df):
     """Create the asset mapping table for the backtest"""
 
-    # Define asset classes in the order they'll be used
-    asset_mapping = [
-        {
-            'Asset_Number': 1,
-            'Asset_Class_Option_Value': 'TotalStockMarket',
-            'Asset_Description': 'US Equities - US Stock Market',
-            'Category': 'Equity'
-        },
-        {
-            'Asset_Number': 2,
-            'Asset_Class_Option_Value': 'IntlDeveloped',
-            'Asset_Description': 'Foreign Developed Equities - Intl Developed ex-US Market',
-            'Category': 'Equity'
-        },
-        {
-            'Asset_Number': 3,
-            'Asset_Class_Option_Value': 'EmergingMarket',
-            'Asset_Description': 'Emerging Market Equities - Emerging Markets',
-            'Category': 'Equity'
-        },
-        {
-            'Asset_Number': 4,
-            'Asset_Class_Option_Value': 'ShortTreasury',
-            'Asset_Description': 'US Treasuries - Short Term Treasury',
-            'Category': 'Fixed Income'
-        },
-        {
-            'Asset_Number': 5,
-            'Asset_Class_Option_Value': 'IntermediateTreasury',
-            'Asset_Description': 'US Treasuries - Intermediate Term Treasury',
-            'Category': 'Fixed Income'
-        },
-        {
-            'Asset_Number': 6,
-            'Asset_Class_Option_Value': 'TreasuryNotes',
-            'Asset_Description': 'US Treasuries - 10-year Treasury',
-            'Category': 'Fixed Income'
-        },
-        {
-            'Asset_Number': 7,
-            'Asset_Class_Option_Value': 'LongTreasury',
-            'Asset_Description': 'US Treasuries - Long Term Treasury',
-            'Category': 'Fixed Income'
-        },
-        {
-            'Asset_Number': 8,
-            'Asset_Class_Option_Value': 'TIPS',
-            'Asset_Description': 'TIPS - Inflation-Protected Bonds',
-            'Category': 'Fixed Income'
-        },
-        {
-            'Asset_Number': 9,
-            'Asset_Class_Option_Value': 'CorpBond',
-            'Asset_Description': 'Corporate Bonds - Investment Grade Corporate Bonds',
-            'Category': 'Fixed Income'
-        },
-        {
-            'Asset_Number': 10,
-            'Asset_Class_Option_Value': 'REIT',
-            'Asset_Description': 'Real Estate/REITs - US REIT',
-            'Category': 'Alternative'
-        }
-    ]
-
     # Create the transposed table (Asset_Number, Asset_Description, Grid_001, Grid_002, ...)
-    asset_df = pd.DataFrame(asset_mapping)
+    # with one transpose of the allocation matrix instead of a column insert per grid
+    meta_df = pd.DataFrame(ASSET_MAPPING)[['Asset_Number', 'Asset_Description']]
+    alloc_matrix = grid_df[ASSET_ORDER].to_numpy(dtype=np.float32).T
+    alloc_df = pd.DataFrame(alloc_matrix, columns=grid_df['Grid_ID'].tolist())
 
-    # Add allocation columns for each grid
-    for _, portfolio in grid_df.iterrows():
-        grid_id = portfolio['Grid_ID']
-        allocations = []
-
-        for asset in asset_df['Asset_Class_Option_Value']:
-            allocations.append(portfolio[asset])
-
-        asset_df[grid_id] = allocations
-
-    return asset_df[['Asset_Number', 'Asset_Description'] + [col for col in asset_df.columns if col.startswith('TreasuryGrid_')]]
+    return pd.concat([meta_df, alloc_df], axis=1)
 
 def main():
     print("=" * 80)
@@ -217,12 +209,14 @@ def main():
 
     # Portfolio grid (Grid_ID as rows, assets as columns)
     grid_file = f'{output_dir}/treasury_term_portfolio_grid.csv'
-    grid_df.to_csv(grid_file, index=False)
+    with open(grid_file, 'w', newline='', buffering=CSV_BUFFER_SIZE) as f:
+        grid_df.to_csv(f, index=False, float_format=CSV_FLOAT_FORMAT)
     print(f"\n✓ Saved portfolio grid: {grid_file}")
 
     # Asset allocation table (Asset_Number as rows, Grid_IDs as columns)
     asset_file = f'{output_dir}/treasury_term_allocations.csv'
-    asset_table.to_csv(asset_file, index=False)
+    with open(asset_file, 'w', newline='', buffering=CSV_BUFFER_SIZE) as f:
+        asset_table.to_csv(f, index=False, float_format=CSV_FLOAT_FORMAT)
     print(f"✓ Saved asset allocations: {asset_file}")
 
     # Summary statistics
@@ -230,13 +224,17 @@ def main():
     print("Treasury Allocation Distribution Across Portfolios:")
     print("=" * 80)
 
-    for treasury_type in ['ShortTreasury', 'IntermediateTreasury', 'TreasuryNotes', 'LongTreasury']:
-        allocations = grid_df[treasury_type]
+    # All four statistics for all four maturities in one aggregation
+    treasury = grid_df[TREASURY_COLUMNS]
+    stats = treasury.agg(['min', 'max', 'mean'])
+    stats.loc['nonzero'] = (treasury > 0).sum()
+
+    for treasury_type in TREASURY_COLUMNS:
         print(f"\n{TREASURY_OPTIONS[treasury_type]}:")
-        print(f"  Min: {allocations.min():.1f}%")
-        print(f"  Max: {allocations.max():.1f}%")
-        print(f"  Mean: {allocations.mean():.1f}%")
-        print(f"  Portfolios with >0%: {(allocations > 0).sum()}")
+        print(f"  Min: {stats.at['min', treasury_type]:.1f}%")
+        print(f"  Max: {stats.at['max', treasury_type]:.1f}%")
+        print(f"  Mean: {stats.at['mean', treasury_type]:.1f}%")
+        print(f"  Portfolios with >0%: {int(stats.at['nonzero', treasury_type])}")
 
     print("\n" + "=" * 80)
     print("Summary")
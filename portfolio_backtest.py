@@ -10,11 +10,17 @@ Hedge Funds, and Venture Capital, and reallocating those weights to REITs.
 Compare against VFINX (Vanguard 500 Index Investor) benchmark.
 """
 
+import numpy as np
 import pandas as pd
 import time
 import os
+import csv
+import json
+import base64
 import shutil
-import glob
+import subprocess
+import traceback
+import urllib.parse
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -23,7 +29,7 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.keys import Keys
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import StaleElementReferenceException
 from dotenv import load_dotenv
 import warnings
 
@@ -32,12 +38,389 @@ warnings.filterwarnings("ignore")
 # Load environment variables from .env file
 load_dotenv()
 
+# Authenticated Portfolio Visualizer cookies, reused across driver launches
+SITE_URL = "https://www.portfoliovisualizer.com/"
+BACKTEST_URL = SITE_URL + "backtest-asset-class-allocation"
+COOKIE_FILE = os.path.expanduser("~/.pv_cookies.json")
+
+# Requests the automation never needs: images, web fonts and third-party
+# analytics/ads. Stylesheets and scripts are kept because the form's
+# modals, tabs and dropdowns depend on them
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*google-analytics.com*", "*googletagmanager.com*",
+    "*doubleclick.net*", "*googlesyndication.com*",
+    "*hotjar.com*", "*facebook.net*",
+]
+
+# Resolved chromedriver binary, remembered across runs so webdriver_manager
+# is only consulted when the cached binary is missing. A binary dropped at
+# bin/chromedriver in the project is used as-is
+PINNED_CHROMEDRIVER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "bin", "chromedriver"
+)
+CHROMEDRIVER_PATH_CACHE = os.path.expanduser(
+    "~/.cache/portfolio_opt/chromedriver_path.txt"
+)
+_chromedriver_path = None
+
+# Chrome binaries to ask for the local browser version, in order
+CHROME_BINARIES = [
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+]
+
+# WebElement references by element ID, reused until the page is reloaded
+_element_cache = {}
+
+# Finds the visible Excel download link in one round trip
+EXCEL_LINK_SCRIPT = (
+    "return [...document.querySelectorAll('a.downloadLink')].find("
+    "a => a.textContent.includes('Excel') && a.offsetParent !== null"
+    ") || null;"
+)
+
+# Fetches arguments[0].href with the page's own credentials and calls back
+# with the body as base64 (null on any failure). FileReader avoids building
+# a huge argument list for btoa(String.fromCharCode(...))
+FETCH_EXCEL_SCRIPT = (
+    "const done = arguments[arguments.length - 1];"
+    "fetch(arguments[0].href, { credentials: 'include' })"
+    ".then(r => r.ok ? r.blob() : Promise.reject(r.status))"
+    ".then(blob => {"
+    " const reader = new FileReader();"
+    " reader.onload = () => done(reader.result.split(',', 2)[1] || null);"
+    " reader.onerror = () => done(null);"
+    " reader.readAsDataURL(blob);"
+    "})"
+    ".catch(() => done(null));"
+)
+
+# Returns the first visible element matching any of the CSS selectors in
+# arguments[0], tried in order, then the first visible button whose text
+# matches the regex in arguments[1] (if given), or null
+FIND_ONE_SCRIPT = (
+    "const visible = e => e.offsetParent !== null"
+    " || e.getClientRects().length > 0;"
+    "for (const s of arguments[0]) {"
+    " for (const e of document.querySelectorAll(s)) {"
+    " if (visible(e)) return e;"
+    " } }"
+    "if (arguments[1]) {"
+    " const re = new RegExp(arguments[1]);"
+    " return [...document.querySelectorAll('button')]"
+    ".find(b => visible(b) && re.test(b.textContent)) || null;"
+    "}"
+    " return null;"
+)
+
+EMAIL_FIELD_SELECTORS = [
+    "#email",
+    "input[name='email']",
+    "input[type='email']",
+    "input[placeholder='Email address']",
+]
+PASSWORD_FIELD_SELECTORS = [
+    "#password",
+    "input[name='password']",
+    "input[type='password']",
+    "input[placeholder='Password']",
+]
+SUBMIT_BUTTON_SELECTORS = ["button[type='submit']", "input[type='submit']"]
+# Fallback for submit buttons that are only recognisable by their label
+SUBMIT_BUTTON_TEXT = "Login|Sign In"
+
+# Asset class option values keyed by the Asset_Description of grid-format
+# allocation files
+ASSET_DESCRIPTION_TO_OPTION = {
+    "US Equities - US Stock Market": "TotalStockMarket",
+    "Foreign Developed Equities - Intl Developed ex-US Market": "IntlDeveloped",
+    "Emerging Market Equities - Emerging Markets": "EmergingMarket",
+    "US Treasuries - Intermediate Term Treasury": "IntermediateTreasury",
+    "TIPS - Inflation-Protected Bonds": "TIPS",
+    "Corporate Bonds - Investment Grade Corporate Bonds": "CorpBond",
+    "Real Estate/REITs - US REIT": "REIT",
+}
+
+# Written to portfolio_allocations.csv when no allocations file exists
+DEFAULT_PORTFOLIO_HEADER = (
+    "Asset_Number",
+    "Asset_Class_Option_Value",
+    "Asset_Description",
+    "Portfolio_1",
+    "Portfolio_2",
+    "Portfolio_3",
+)
+DEFAULT_PORTFOLIO_ROWS = (
+    (1, "TotalStockMarket", "US Equities - US Stock Market", 30.0, 20.0, 40.0),
+    (2, "IntlDeveloped", "Foreign Developed Equities - Intl Developed ex-US Market",
+     15.0, 15.0, 15.0),
+    (3, "EmergingMarket", "Emerging Market Equities - Emerging Markets",
+     8.0, 8.0, 8.0),
+    (4, "IntermediateTreasury", "US Treasuries - Intermediate Term Treasury",
+     10.0, 20.0, 0.0),
+    (5, "TIPS", "TIPS - Inflation-Protected Bonds", 15.0, 15.0, 15.0),
+    (6, "CorpBond", "Corporate Bonds - Investment Grade Corporate Bonds",
+     7.5, 7.5, 7.5),
+    (7, "REIT", "Real Estate/REITs - US REIT", 14.5, 14.5, 14.5),
+)
+
 
 # ============================================================================
 # Helper Functions
 # ============================================================================
 
 
+def clear_element_cache():
+    """
+    Forget cached element references. Call after navigating to a new page.
+    """
+    _element_cache.clear()
+
+
+def find_element_by_id_cached(driver, element_id, wait_time=5):
+    """
+    Return the element with the given ID, looking it up only on a cache miss.
+
+    Args:
+        driver: Selenium WebDriver instance
+        element_id: ID of the element to find
+        wait_time: Maximum time to wait for the element on a cache miss
+            (default: 5 seconds)
+
+    Returns:
+        WebElement: The (possibly cached) element
+    """
+    element = _element_cache.get(element_id)
+    if element is None:
+        element = WebDriverWait(driver, wait_time).until(
+            EC.presence_of_element_located((By.ID, element_id))
+        )
+        _element_cache[element_id] = element
+    return element
+
+
+def find_excel_link(driver, wait_time=10, previous=None):
+    """
+    Wait for the Excel download link using a CSS lookup filtered in JS.
+
+    Args:
+        driver: Selenium WebDriver instance
+        wait_time: Maximum time to wait for the link (default: 10 seconds)
+        previous: Link from earlier results on the same page, if any; only
+            a different link counts, so old results are not mistaken for
+            the ones being waited for
+
+    Returns:
+        WebElement: The Excel download link
+    """
+    def new_link(d):
+        link = d.execute_script(EXCEL_LINK_SCRIPT)
+        return link if link is not None and link != previous else None
+
+    return WebDriverWait(driver, wait_time).until(new_link)
+
+
+def find_one(driver, selectors, timeout=10, button_text=None):
+    """
+    Wait for the first visible element matching any of several CSS
+    selectors. All selectors are checked in a single script call per poll,
+    so fallbacks cost nothing when the first selector matches.
+
+    Args:
+        driver: Selenium WebDriver instance
+        selectors: CSS selectors in order of preference
+        timeout: Maximum time to wait (default: 10 seconds)
+        button_text: Optional regex; if no selector matches, the first
+            visible button whose text matches it is returned
+
+    Returns:
+        WebElement: The first matching element
+
+    Raises:
+        TimeoutException: If no selector matches a visible element in time
+    """
+    return WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script(FIND_ONE_SCRIPT, selectors, button_text)
+    )
+
+
+def get_local_chrome_version():
+    """
+    Return the installed Chrome's version string (e.g. "Google Chrome
+    126.0.6478.126"), or None if no Chrome binary answers.
+    """
+    for binary in CHROME_BINARIES:
+        executable = binary if os.path.isabs(binary) else shutil.which(binary)
+        if not executable or not os.path.exists(executable):
+            continue
+        try:
+            result = subprocess.run(
+                [executable, "--version"],
+                capture_output=True, text=True, timeout=5,
+            )
+        except (OSError, subprocess.SubprocessError):
+            continue
+        if result.returncode == 0 and result.stdout.strip():
+            return result.stdout.strip()
+    return None
+
+
+def get_chromedriver_path():
+    """
+    Return the chromedriver binary path, resolving it at most once.
+
+    Checks, in order: the CHROMEDRIVER_PATH environment variable, a
+    pinned binary at bin/chromedriver, the path cached by a previous run
+    for the same local Chrome version, and finally
+    ChromeDriverManager().install(), whose result is cached with the
+    Chrome version for next time. webdriver_manager is only imported for
+    that last step; if it is not installed, None is returned and Selenium
+    Manager resolves the driver instead.
+
+    Returns:
+        str: Path to the chromedriver binary, or None
+    """
+    global _chromedriver_path
+    if _chromedriver_path:
+        return _chromedriver_path
+
+    path = next(
+        (c for c in (os.environ.get("CHROMEDRIVER_PATH"), PINNED_CHROMEDRIVER)
+         if c and os.path.exists(c)),
+        None,
+    )
+
+    if path is None:
+        # The cache holds "<chrome version>\n<driver path>"; a Chrome update
+        # invalidates it. If the version cannot be read, trust the cache
+        chrome_version = get_local_chrome_version() or ""
+        try:
+            with open(CHROMEDRIVER_PATH_CACHE) as f:
+                cached_version, _, cached_path = f.read().strip().rpartition("\n")
+            if (
+                os.path.exists(cached_path)
+                and (not chrome_version or cached_version == chrome_version)
+            ):
+                path = cached_path
+        except OSError:
+            pass
+
+    if path is None:
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+        except ImportError:
+            return None
+
+        # Keep webdriver_manager quiet; it reuses ~/.wdm when it can
+        os.environ.setdefault("WDM_LOG", "0")
+        os.environ.setdefault("WDM_LOG_LEVEL", "0")
+        path = ChromeDriverManager().install()
+        try:
+            os.makedirs(os.path.dirname(CHROMEDRIVER_PATH_CACHE), exist_ok=True)
+            with open(CHROMEDRIVER_PATH_CACHE, "w") as f:
+                f.write(f"{chrome_version}\n{path}")
+        except OSError as e:
+            print(f"Warning: Could not cache chromedriver path: {e}")
+
+    _chromedriver_path = path
+    return path
+
+
+def build_chrome_options(download_dir, headless=True, user_data_dir=None):
+    """
+    Build Chrome options for the backtest session.
+
+    Images are never needed to fill the form or read results, so they are
+    blocked, along with extensions and background services the automation
+    never uses. Stylesheets are left on because modal, tab and dropdown
+    visibility checks depend on them.
+
+    Args:
+        download_dir: Directory Chrome saves downloads to
+        headless: Run Chrome with the new headless mode (default: True)
+        user_data_dir: Optional persistent Chrome profile directory, which
+            keeps the login session and HTTP cache between runs
+
+    Returns:
+        ChromeOptions: Configured options
+    """
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+    # Fixed size at launch instead of a maximize_window() round trip
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-sync")
+    options.add_argument("--disable-translate")
+    options.add_argument("--blink-settings=imagesEnabled=false")
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+
+    prefs = {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True,
+        "profile.managed_default_content_settings.images": 2,
+    }
+    options.add_experimental_option("prefs", prefs)
+    return options
+
+
+def block_unneeded_requests(driver):
+    """
+    Block image, font and tracker requests via the DevTools protocol.
+
+    Args:
+        driver: Selenium WebDriver instance (Chrome)
+
+    Returns:
+        bool: True if the block list was installed, False otherwise
+    """
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd(
+            "Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS}
+        )
+        return True
+    except Exception as e:
+        print(f"Warning: Could not block unneeded requests: {e}")
+        return False
+
+
+def wait_for_tab_selected(driver, tab_id, wait_time=5):
+    """
+    Wait for a tab button to report aria-selected="true" after a click.
+
+    Args:
+        driver: Selenium WebDriver instance
+        tab_id: ID of the tab button
+        wait_time: Maximum time to wait (default: 5 seconds)
+
+    Returns:
+        bool: True if the tab became selected, False on timeout
+    """
+    try:
+        WebDriverWait(driver, wait_time).until(
+            EC.presence_of_element_located(
+                (By.CSS_SELECTOR, f"#{tab_id}[aria-selected='true']")
+            )
+        )
+        return True
+    except Exception:
+        print(f"Warning: {tab_id} did not report selected; continuing")
+        return False
+
+
 def select_dropdown_value(
     driver, selector, value, by_value=True, wait_time=10, scroll=True
 ):
@@ -65,12 +448,11 @@ def select_dropdown_value(
             EC.presence_of_element_located((By.CSS_SELECTOR, selector))
         )
 
-        # Scroll into view if requested
+        # Scroll into view if requested (synchronous, no pause needed)
         if scroll:
             driver.execute_script(
                 "arguments[0].scrollIntoView({block: 'center'});", element
             )
-            time.sleep(0.5)
 
         # Try multiple approaches to select the value
         success = False
@@ -90,19 +472,15 @@ def select_dropdown_value(
         except Exception as e1:
             # Approach 2: Use JavaScript to set the value directly
             try:
-                driver.execute_script(f"arguments[0].value = '{value}';", element)
-                # Trigger change event to ensure the page recognizes
-                # the change
-                driver.execute_script(
-                    "arguments[0].dispatchEvent(new Event('change', "
-                    "{ bubbles: true }));",
-                    element,
-                )
-                # Also try input event
+                # Set the value and fire change/input events in a single
+                # round trip so the page recognizes the change
                 driver.execute_script(
-                    "arguments[0].dispatchEvent(new Event('input', "
-                    "{ bubbles: true }));",
+                    "const e = arguments[0];"
+                    "e.value = arguments[1];"
+                    "e.dispatchEvent(new Event('change', { bubbles: true }));"
+                    "e.dispatchEvent(new Event('input', { bubbles: true }));",
                     element,
+                    str(value),
                 )
                 print(f"Selected '{value}' in {selector} (using JavaScript)")
                 success = True
@@ -110,7 +488,16 @@ def select_dropdown_value(
                 # Approach 3: Try clicking and using keyboard navigation
                 try:
                     element.click()
-                    time.sleep(0.3)
+                    # Wait for the dropdown to take focus before typing
+                    try:
+                        WebDriverWait(driver, 2).until(
+                            lambda d: d.execute_script(
+                                "return document.activeElement === arguments[0];",
+                                element,
+                            )
+                        )
+                    except Exception:
+                        pass
                     # If it's a dropdown that opens, we might need to
                     # select the option. For now, try sending the value
                     # directly
@@ -124,8 +511,6 @@ def select_dropdown_value(
                     print(f"  JavaScript approach: {e2}")
                     print(f"  Click/keys approach: {e3}")
 
-        if success:
-            time.sleep(0.5)  # Brief pause after selection
         return success
 
     except Exception as e:
@@ -174,25 +559,30 @@ def enter_portfolio_allocation(driver, asset_num, portfolio_num, allocation):
     """
     field_id = f"allocation{asset_num}_{portfolio_num}"
     try:
-        field = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.ID, field_id))
-        )
-
-        # Scroll into view
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", field)
-        time.sleep(0.2)
-
-        # Clear and set the value using JavaScript (more reliable)
-        driver.execute_script(f"arguments[0].value = '{allocation}';", field)
-        # Trigger input event to ensure the page recognizes the change
-        driver.execute_script(
-            "arguments[0].dispatchEvent(new Event('input', " "{ bubbles: true }));",
-            field,
-        )
-        driver.execute_script(
-            "arguments[0].dispatchEvent(new Event('change', " "{ bubbles: true }));",
-            field,
-        )
+        # Scroll into view (only if off screen), set the value and trigger
+        # input/change events in one synchronous script (one WebDriver
+        # round trip per field). A cached reference that went stale is
+        # looked up again once.
+        for attempt in range(2):
+            field = find_element_by_id_cached(driver, field_id)
+            try:
+                driver.execute_script(
+                    "const e = arguments[0];"
+                    "const r = e.getBoundingClientRect();"
+                    "if (r.top < 0 || r.bottom > window.innerHeight) {"
+                    "  e.scrollIntoView({block: 'center'});"
+                    "}"
+                    "e.value = arguments[1];"
+                    "e.dispatchEvent(new Event('input', { bubbles: true }));"
+                    "e.dispatchEvent(new Event('change', { bubbles: true }));",
+                    field,
+                    str(allocation),
+                )
+                break
+            except StaleElementReferenceException:
+                _element_cache.pop(field_id, None)
+                if attempt:
+                    raise
 
         print(f"Set Asset {asset_num}, Portfolio {portfolio_num} " f"to {allocation}%")
         return True
@@ -201,6 +591,96 @@ def enter_portfolio_allocation(driver, asset_num, portfolio_num, allocation):
         return False
 
 
+# Sets asset class dropdowns and allocation fields in one browser round
+# trip and reports the ones it could not set
+FILL_FORM_SCRIPT = (
+    "const [classes, allocations] = arguments;"
+    "const fire = el => {"
+    "  el.dispatchEvent(new Event('input', { bubbles: true }));"
+    "  el.dispatchEvent(new Event('change', { bubbles: true }));"
+    "};"
+    "const failedClasses = [];"
+    "for (const [a, v] of classes) {"
+    "  const el = document.getElementById('asset' + a);"
+    "  if (!el || ![...el.options].some(o => o.value === v)) {"
+    "    failedClasses.push(a); continue;"
+    "  }"
+    "  el.value = v; fire(el);"
+    "}"
+    "const failedAllocations = [];"
+    "if (allocations.length) {"
+    "  const first = document.getElementById("
+    "    'allocation' + allocations[0][0] + '_' + allocations[0][1]);"
+    "  if (first) first.scrollIntoView({block: 'start'});"
+    "}"
+    "for (const [a, p, v] of allocations) {"
+    "  const el = document.getElementById('allocation' + a + '_' + p);"
+    "  if (!el) { failedAllocations.push([a, p]); continue; }"
+    "  el.value = v; fire(el);"
+    "}"
+    "return [failedClasses, failedAllocations];"
+)
+
+
+def fill_portfolio_form(driver, asset_class_mappings, allocations_dict, wait_time=10):
+    """
+    Set every asset class dropdown and portfolio allocation in a single
+    execute_script call. Anything the script cannot set (missing element
+    or option) is retried one at a time with set_asset_class or
+    enter_portfolio_allocation.
+
+    Args:
+        driver: Selenium WebDriver instance
+        asset_class_mappings: Dictionary mapping asset_num to option value
+        allocations_dict: Dictionary mapping (asset_num, portfolio_num)
+            to allocation percentage
+        wait_time: Maximum time to wait for the form (default: 10 seconds)
+
+    Returns:
+        bool: True if every field was set, False otherwise
+    """
+    classes = [[asset_num, str(option_value)]
+               for asset_num, option_value in asset_class_mappings.items()]
+    allocations = [[asset_num, portfolio_num, str(allocation)]
+                   for (asset_num, portfolio_num), allocation in allocations_dict.items()]
+    if not classes and not allocations:
+        return True
+
+    if classes:
+        first_id = f"asset{classes[0][0]}"
+    else:
+        first_id = f"allocation{allocations[0][0]}_{allocations[0][1]}"
+    try:
+        WebDriverWait(driver, wait_time).until(
+            EC.presence_of_element_located((By.ID, first_id))
+        )
+        failed_classes, failed_allocations = driver.execute_script(
+            FILL_FORM_SCRIPT, classes, allocations
+        )
+    except Exception as e:
+        print(f"Error bulk filling portfolio form: {e}")
+        failed_classes = [asset_num for asset_num, _ in classes]
+        failed_allocations = [[asset_num, portfolio_num]
+                              for asset_num, portfolio_num, _ in allocations]
+
+    failed_classes = set(failed_classes)
+    failed_allocations = {tuple(key) for key in failed_allocations}
+    for asset_num, option_value in classes:
+        if asset_num not in failed_classes:
+            print(f"Set Asset {asset_num} class to {option_value}")
+    for asset_num, portfolio_num, allocation in allocations:
+        if (asset_num, portfolio_num) not in failed_allocations:
+            print(f"Set Asset {asset_num}, Portfolio {portfolio_num} to {allocation}%")
+
+    # Asset classes first: allocation rows may depend on them
+    success = True
+    for asset_num in failed_classes:
+        success &= set_asset_class(driver, asset_num, asset_class_mappings[asset_num])
+    for key in failed_allocations:
+        success &= enter_portfolio_allocation(driver, *key, allocations_dict[key])
+    return success
+
+
 def validate_portfolio_weights(allocations_dict):
     """
     Validate that portfolio weights sum to 100% for each portfolio.
@@ -236,6 +716,119 @@ def validate_portfolio_weights(allocations_dict):
     return validation_results
 
 
+def set_input_value(driver, element, value):
+    """
+    Set a text input's value and fire input/change events in one
+    execute_script call, instead of typing it key by key.
+
+    Args:
+        driver: Selenium WebDriver instance
+        element: Input element to fill
+        value: Text to put in the field
+    """
+    driver.execute_script(
+        "const e = arguments[0];"
+        "e.value = arguments[1];"
+        "e.dispatchEvent(new Event('input', { bubbles: true }));"
+        "e.dispatchEvent(new Event('change', { bubbles: true }));",
+        element,
+        str(value),
+    )
+
+
+def prefetch_backtest_page(driver):
+    """
+    Hint the browser to fetch the backtest page into its cache while the
+    current page (e.g. the login redirect) is still loading, so the later
+    navigation to it is served from cache.
+
+    Args:
+        driver: Selenium WebDriver instance
+    """
+    try:
+        driver.execute_script(
+            "const l = document.createElement('link');"
+            "l.rel = 'prefetch';"
+            "l.href = arguments[0];"
+            "document.head.appendChild(l);",
+            BACKTEST_URL,
+        )
+    except Exception:
+        # Purely an optimization; navigation works without it
+        pass
+
+
+def save_session_cookies(driver, cookie_file=COOKIE_FILE):
+    """
+    Save the authenticated session cookies for later driver launches.
+
+    Args:
+        driver: Selenium WebDriver instance (logged in)
+        cookie_file: Path of the cookie file (default: ~/.pv_cookies.json)
+    """
+    try:
+        fd = os.open(cookie_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(driver.get_cookies(), f)
+        print(f"Saved session cookies to {cookie_file}")
+    except Exception as e:
+        print(f"Warning: Could not save session cookies: {e}")
+
+
+def restore_login_session(driver, cookie_file=COOKIE_FILE, wait_time=3,
+                          profile_in_use=False):
+    """
+    Restore a saved login session so the login form can be skipped.
+    Saved cookies are installed over CDP before the first navigation, and
+    a persistent Chrome profile may already carry a valid session, so the
+    backtest page is loaded once to confirm the session is still valid.
+
+    Args:
+        driver: Selenium WebDriver instance
+        cookie_file: Path of the cookie file (default: ~/.pv_cookies.json)
+        wait_time: Maximum time to wait for the account dropdown
+            (default: 3 seconds)
+        profile_in_use: True if Chrome was started with an existing
+            user-data-dir that may hold a previous session
+
+    Returns:
+        bool: True if the restored session is logged in, False otherwise
+    """
+    has_cookie_file = os.path.exists(cookie_file)
+    if not has_cookie_file and not profile_in_use:
+        return False
+
+    try:
+        if has_cookie_file:
+            with open(cookie_file) as f:
+                cookies = json.load(f)
+
+            cdp_cookies = []
+            for cookie in cookies:
+                cdp_cookie = {
+                    key: cookie[key]
+                    for key in ("name", "value", "domain", "path",
+                                "secure", "httpOnly", "sameSite")
+                    if key in cookie
+                }
+                if "expiry" in cookie:
+                    cdp_cookie["expires"] = cookie["expiry"]
+                cdp_cookies.append(cdp_cookie)
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": cdp_cookies})
+
+        # Check on the backtest page itself so a valid session needs no
+        # further navigation
+        driver.get(BACKTEST_URL)
+        WebDriverWait(driver, wait_time).until(
+            EC.presence_of_element_located((By.ID, "accountDropdown"))
+        )
+        print("✓ Restored saved login session")
+        return True
+    except Exception:
+        print("Saved login session not valid - logging in")
+        return False
+
+
 def handle_login_from_modal(driver):
     """
     Handle login when the "Login Required" modal appears.
@@ -261,70 +854,34 @@ def handle_login_from_modal(driver):
                 login_modal_button.click()
             except Exception:
                 driver.execute_script("arguments[0].click();", login_modal_button)
-            time.sleep(2)
 
-            # Now find and fill the login form
+            # Now find and fill the login form (the wait below covers the
+            # modal transition)
             # Find and fill username field
-            username_field = None
             try:
-                username_field = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "email"))
-                )
+                username_field = find_one(driver, EMAIL_FIELD_SELECTORS)
             except Exception:
-                try:
-                    username_field = driver.find_element(By.NAME, "email")
-                except Exception:
-                    username_field = driver.find_element(
-                        By.XPATH, "//input[@type='email']"
-                    )
-
-            if username_field:
-                username_field.clear()
-                username_field.send_keys(username)
-                print(f"Entered username: {username}")
-                time.sleep(0.5)
-            else:
                 print("Warning: Could not find username field")
                 return False
+            set_input_value(driver, username_field, username)
+            print(f"Entered username: {username}")
 
             # Find and fill password field
-            password_field = None
             try:
-                password_field = driver.find_element(By.ID, "password")
+                password_field = find_one(driver, PASSWORD_FIELD_SELECTORS, timeout=2)
             except Exception:
-                try:
-                    password_field = driver.find_element(By.NAME, "password")
-                except Exception:
-                    password_field = driver.find_element(
-                        By.XPATH, "//input[@type='password']"
-                    )
-
-            if password_field:
-                password_field.clear()
-                password_field.send_keys(password)
-                print("Entered password")
-                time.sleep(0.5)
-            else:
                 print("Warning: Could not find password field")
                 return False
+            set_input_value(driver, password_field, password)
+            print("Entered password")
 
             # Find and click submit button
-            submit_button = None
-            try:
-                submit_button = driver.find_element(
-                    By.XPATH, "//button[@type='submit']"
-                )
-            except Exception:
-                try:
-                    submit_button = driver.find_element(
-                        By.XPATH, "//input[@type='submit']"
-                    )
-                except Exception:
-                    submit_button = driver.find_element(
-                        By.XPATH,
-                        "//button[contains(text(), 'Login') or "
-                        "contains(text(), 'Sign In')]",
-                    )
+            submit_button = find_one(
+                driver,
+                SUBMIT_BUTTON_SELECTORS,
+                timeout=2,
+                button_text=SUBMIT_BUTTON_TEXT,
+            )
 
             if submit_button:
                 try:
@@ -334,16 +891,16 @@ def handle_login_from_modal(driver):
                         "arguments[0].click();", submit_button
                     )
                 print("Clicked login submit button")
-                time.sleep(3)
 
                 # Check if login was successful
                 try:
-                    WebDriverWait(driver, 10).until(
+                    WebDriverWait(driver, 15).until(
                         EC.presence_of_element_located(
                             (By.ID, "accountDropdown")
                         )
                     )
                     print("Login successful - account dropdown found")
+                    save_session_cookies(driver)
                     return True
                 except Exception:
                     print(
@@ -361,140 +918,203 @@ def handle_login_from_modal(driver):
 
     except Exception as e:
         print(f"Error during login from modal: {e}")
-        import traceback
-
         traceback.print_exc()
         return False
 
 
-def download_excel_results(driver, download_dir, output_filename=None):
+def list_download_dir(download_dir):
     """
-    Click the Excel download button and save the file.
-    Handles login modal if it appears.
+    List file names in the download directory with a single scandir pass.
 
     Args:
-        driver: Selenium WebDriver instance
         download_dir: Directory where downloads are saved
-        output_filename: Optional custom filename (with .xlsx extension)
 
     Returns:
-        str: Path to downloaded file, or None if failed
+        set: Names of the entries currently in the directory
     """
     try:
-        # Find the Excel download link
-        excel_link = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable(
-                (
-                    By.XPATH,
-                    "//a[@class='downloadLink' and contains(., 'Excel')]",
-                )
-            )
-        )
+        with os.scandir(download_dir) as entries:
+            return {entry.name for entry in entries}
+    except FileNotFoundError:
+        return set()
 
-        # Get list of files before download
-        files_before = set(glob.glob(os.path.join(download_dir, "*")))
 
-        # Scroll into view
-        driver.execute_script(
-            "arguments[0].scrollIntoView({block: 'center'});", excel_link
-        )
-        time.sleep(0.5)
+def wait_for_download(download_dir, names_before, timeout=30, poll_interval=0.1):
+    """
+    Wait for a new, completed Excel file to appear in the download directory.
 
-        # Click the Excel download link
-        try:
-            excel_link.click()
-            print("Clicked Excel download link")
-        except Exception:
-            # Try JavaScript click if regular click fails
-            driver.execute_script("arguments[0].click();", excel_link)
-            print("Clicked Excel download link (JavaScript)")
+    Args:
+        download_dir: Directory where downloads are saved
+        names_before: Entry names present before the download was triggered
+        timeout: Maximum time to wait in seconds (default: 30)
+        poll_interval: Time between directory scans in seconds (default: 0.1)
 
-        time.sleep(1)  # Wait a moment for modal to appear if needed
+    Returns:
+        str: Path to the downloaded file, or None if nothing appeared
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        # Chrome writes to a .crdownload file and renames it when done,
+        # so only the final .xlsx/.xls name counts as complete
+        for name in list_download_dir(download_dir) - names_before:
+            if name.endswith(".xlsx") or name.endswith(".xls"):
+                return os.path.join(download_dir, name)
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(poll_interval)
 
-        # Check if login modal appeared
-        try:
-            WebDriverWait(driver, 3).until(
-                EC.presence_of_element_located(
-                    (By.ID, "confirmDialogTitle")
-                )
-            )
-            modal_text = driver.find_element(By.ID, "confirmText").text
-            dialog_title = driver.find_element(
-                By.ID, "confirmDialogTitle"
-            ).text
-            if (
-                "Login Required" in dialog_title
-                or "login" in modal_text.lower()
-            ):
-                print("Login Required modal appeared - handling login...")
-                login_success = handle_login_from_modal(driver)
-
-                if login_success:
-                    # Wait a moment for page to update
-                    time.sleep(2)
-                    # Navigate back to results page if needed, or retry
-                    # download. For now, try clicking the Excel link again
-                    try:
-                        excel_link = WebDriverWait(driver, 10).until(
-                            EC.element_to_be_clickable(
-                                (
-                                    By.XPATH,
-                                    "//a[@class='downloadLink' and "
-                                    "contains(., 'Excel')]",
-                                )
-                            )
-                        )
-                        driver.execute_script(
-                            "arguments[0].scrollIntoView({block: 'center'});",
-                            excel_link,
-                        )
-                        time.sleep(0.5)
-                        try:
-                            excel_link.click()
-                            print(
-                                "Clicked Excel download link again after login"
-                            )
-                        except Exception:
-                            driver.execute_script(
-                                "arguments[0].click();", excel_link
-                            )
-                            print(
-                                "Clicked Excel download link again after login "
-                                "(JavaScript)"
-                            )
-                        time.sleep(1)
-                    except Exception:
-                        print("Warning: Could not find Excel link after login")
-                else:
-                    print("Login failed - cannot download")
-                    return None
-        except Exception:
-            # No modal appeared, download should proceed
-            pass
 
-        # Wait for download to complete (check for new file)
-        print("Waiting for download to complete...")
-        max_wait = 30
-        wait_time = 0
-        downloaded_file = None
-
-        while wait_time < max_wait:
-            time.sleep(1)
-            wait_time += 1
-            files_after = set(glob.glob(os.path.join(download_dir, "*")))
-            new_files = files_after - files_before
-
-            # Look for .xlsx files
-            for file_path in new_files:
-                if file_path.endswith(".xlsx") or file_path.endswith(".xls"):
-                    # Check if file is still being downloaded
-                    # (Chrome adds .crdownload extension)
-                    if not file_path.endswith(".crdownload"):
-                        downloaded_file = file_path
-                        break
-
-            if downloaded_file:
-                break
+def fetch_excel_in_page(driver, excel_link, download_dir):
+    """
+    Fetch the Excel results with fetch() inside the page, so the request
+    carries the browser's own cookies, and return the bytes through
+    execute_async_script instead of waiting for Chrome's download.
+
+    Args:
+        driver: Selenium WebDriver instance
+        excel_link: The Excel download link element
+        download_dir: Directory to save the file in
+
+    Returns:
+        str: Path to the saved file, or None if the link is not a plain URL
+            or the fetch did not return an Excel workbook
+    """
+    try:
+        href = excel_link.get_attribute("href")
+        if not href or not href.startswith(("http://", "https://")):
+            return None
+        # href="#" and script-driven links resolve to the page itself;
+        # fetching those would just return the results page again
+        page_url = urllib.parse.urldefrag(driver.current_url).url
+        if urllib.parse.urldefrag(href).url == page_url:
+            return None
+        encoded = driver.execute_async_script(FETCH_EXCEL_SCRIPT, excel_link)
+    except Exception as e:
+        print(f"In-page Excel fetch failed ({e})")
+        return None
+    if not encoded:
+        return None
+
+    path = save_excel_content(base64.b64decode(encoded), download_dir)
+    if path:
+        print("Downloaded Excel results in the page")
+    return path
+
+
+def save_excel_content(content, download_dir):
+    """
+    Save fetched Excel bytes to download_dir.
+
+    Args:
+        content: Response body
+        download_dir: Directory to save the file in
+
+    Returns:
+        str: Path to the saved file, or None if content is not a workbook
+    """
+    # .xlsx files are zip archives; anything else (e.g. a login page)
+    # means the browser flow is needed
+    if not content.startswith(b"PK"):
+        return None
+
+    os.makedirs(download_dir, exist_ok=True)
+    path = os.path.join(download_dir, f"excel_download_{os.getpid()}.xlsx")
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def download_excel_results(driver, download_dir, output_filename=None):
+    """
+    Click the Excel download button and save the file.
+    Handles login modal if it appears.
+
+    Args:
+        driver: Selenium WebDriver instance
+        download_dir: Directory where downloads are saved
+        output_filename: Optional custom filename (with .xlsx extension)
+
+    Returns:
+        str: Path to downloaded file, or None if failed
+    """
+    try:
+        # Find the Excel download link
+        excel_link = find_excel_link(driver)
+
+        # Fetch the file in the page when the link is a plain URL; otherwise
+        # click it and wait for Chrome's download
+        downloaded_file = fetch_excel_in_page(driver, excel_link, download_dir)
+
+        if downloaded_file is None:
+            # Get list of files before download
+            files_before = list_download_dir(download_dir)
+
+            # Scroll into view
+            driver.execute_script(
+                "arguments[0].scrollIntoView({block: 'center'});", excel_link
+            )
+
+            # Click the Excel download link
+            try:
+                excel_link.click()
+                print("Clicked Excel download link")
+            except Exception:
+                # Try JavaScript click if regular click fails
+                driver.execute_script("arguments[0].click();", excel_link)
+                print("Clicked Excel download link (JavaScript)")
+
+            # Check if login modal appeared
+            try:
+                WebDriverWait(driver, 4).until(
+                    EC.presence_of_element_located(
+                        (By.ID, "confirmDialogTitle")
+                    )
+                )
+                modal_text = driver.find_element(By.ID, "confirmText").text
+                dialog_title = driver.find_element(
+                    By.ID, "confirmDialogTitle"
+                ).text
+                if (
+                    "Login Required" in dialog_title
+                    or "login" in modal_text.lower()
+                ):
+                    print("Login Required modal appeared - handling login...")
+                    login_success = handle_login_from_modal(driver)
+
+                    if login_success:
+                        # Navigate back to results page if needed, or retry
+                        # download. For now, try clicking the Excel link again
+                        try:
+                            excel_link = find_excel_link(driver)
+                            driver.execute_script(
+                                "arguments[0].scrollIntoView({block: 'center'});",
+                                excel_link,
+                            )
+                            try:
+                                excel_link.click()
+                                print(
+                                    "Clicked Excel download link again after login"
+                                )
+                            except Exception:
+                                driver.execute_script(
+                                    "arguments[0].click();", excel_link
+                                )
+                                print(
+                                    "Clicked Excel download link again after login "
+                                    "(JavaScript)"
+                                )
+                        except Exception:
+                            print("Warning: Could not find Excel link after login")
+                    else:
+                        print("Login failed - cannot download")
+                        return None
+            except Exception:
+                # No modal appeared, download should proceed
+                pass
+
+            # Wait for download to complete (check for new file)
+            print("Waiting for download to complete...")
+            downloaded_file = wait_for_download(download_dir, files_before)
 
         if downloaded_file:
             print(f"Downloaded file: {downloaded_file}")
@@ -531,28 +1151,124 @@ def download_excel_results(driver, download_dir, output_filename=None):
 
     except Exception as e:
         print(f"Error downloading Excel file: {e}")
-        import traceback
-
         traceback.print_exc()
         return None
 
 
+def unique_output_path(output_dir, filename):
+    """
+    Return a path in output_dir for filename that does not overwrite an
+    existing file, adding the first free _<n> counter suffix if needed.
+    The directory is listed once and candidates are checked in memory.
+
+    Args:
+        output_dir: Destination directory
+        filename: Desired file name
+
+    Returns:
+        str: Path to a file name not present in output_dir
+    """
+    existing = set(os.listdir(output_dir))
+    if filename not in existing:
+        return os.path.join(output_dir, filename)
+
+    base_name, ext = os.path.splitext(filename)
+    counter = 1
+    while f"{base_name}_{counter}{ext}" in existing:
+        counter += 1
+    return os.path.join(output_dir, f"{base_name}_{counter}{ext}")
+
+
+def ensure_asset_rows(driver, asset_count, max_clicks=5):
+    """
+    Make sure the form has at least asset_count asset rows, clicking the
+    "More" link only when the existing rows are not enough.
+
+    Args:
+        driver: Selenium WebDriver instance
+        asset_count: Number of asset rows needed
+        max_clicks: Give up after this many clicks (default: 5)
+
+    Returns:
+        bool: True if the form has enough rows
+    """
+    row_locator = (By.CSS_SELECTOR, "input[id^='allocation'][id$='_1']")
+    row_count = len(driver.find_elements(*row_locator))
+    if row_count >= asset_count:
+        return True
+
+    print(f"Adding asset rows ({row_count} shown, {asset_count} needed)")
+    try:
+        for _ in range(max_clicks):
+            # Find the "More" link by its onclick attribute
+            more_button = WebDriverWait(driver, 10).until(
+                EC.element_to_be_clickable(
+                    (
+                        By.XPATH,
+                        "//a[contains(@onclick, 'addAssetRows') and "
+                        "contains(text(), 'More')]",
+                    )
+                )
+            )
+            driver.execute_script(
+                "arguments[0].scrollIntoView({block: 'center'});", more_button
+            )
+            try:
+                more_button.click()
+            except Exception:
+                # Try JavaScript click if regular click fails
+                driver.execute_script("arguments[0].click();", more_button)
+            print("Clicked 'More' button to add rows")
+
+            # Wait for rows to be added
+            previous_count = row_count
+            WebDriverWait(driver, 5).until(
+                lambda d: len(d.find_elements(*row_locator)) > previous_count
+            )
+            row_count = len(driver.find_elements(*row_locator))
+            if row_count >= asset_count:
+                return True
+    except Exception as e:
+        print(f"Warning: Could not click 'More' button: {e}")
+
+    print(f"Warning: form has {row_count} asset rows, {asset_count} needed")
+    return False
+
+
+def clear_allocation_fields(driver):
+    """
+    Blank every allocation field so a reused form starts from a clean
+    state before the next portfolios are entered.
+
+    Args:
+        driver: Selenium WebDriver instance
+    """
+    driver.execute_script(
+        "document.querySelectorAll(\"input[id^='allocation']\").forEach(e => {"
+        "  e.value = '';"
+        "  e.dispatchEvent(new Event('input', { bubbles: true }));"
+        "  e.dispatchEvent(new Event('change', { bubbles: true }));"
+        "});"
+    )
+
+
 # ============================================================================
 # Main Script
 # ============================================================================
 
 
-def main(allocations_file=None, output_alias=None):
-    """Main execution function
+def setup_session(headless=True):
+    """Start Chrome, log in and prepare the backtest form (Steps 1-4)
+
+    The returned driver is parked on the backtest page with the start year
+    and benchmark configured, ready for run_one_backtest, which adds asset
+    rows if a file needs more than the form shows.
 
     Args:
-        allocations_file: Path to CSV file with portfolio allocations.
-                         If None, uses default portfolio_allocations.csv
-        output_alias: Alias for the output file (e.g., 'coarse_grid').
-                     If None, uses timestamp-based naming
+        headless: Run Chrome in headless mode (default: True)
 
     Returns:
-        Path to results file
+        Selenium WebDriver instance
     """
 
     # Get project directory
@@ -560,26 +1276,22 @@ def main(allocations_file=None, output_alias=None):
 
     # Initialize Chrome driver
     print("Initializing Chrome WebDriver...")
-    options = webdriver.ChromeOptions()
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-
     # Configure download preferences
     download_dir = os.path.join(project_dir, "downloads")
     os.makedirs(download_dir, exist_ok=True)
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True,
-    }
-    options.add_experimental_option("prefs", prefs)
+    # Persistent profile: keeps the session cookie and cache across runs
+    profile_dir = os.path.join(project_dir, ".chrome_profile")
+    profile_in_use = os.path.isdir(profile_dir)
+    options = build_chrome_options(
+        download_dir, headless=headless, user_data_dir=profile_dir
+    )
 
     # Create driver
+    # keep_alive reuses one HTTP connection to chromedriver for every command
     driver = webdriver.Chrome(
-        service=Service(ChromeDriverManager().install()), options=options
+        service=Service(get_chromedriver_path()), options=options, keep_alive=True
     )
-    driver.maximize_window()
+    block_unneeded_requests(driver)
     print("Chrome WebDriver initialized successfully")
 
     try:
@@ -587,132 +1299,98 @@ def main(allocations_file=None, output_alias=None):
         # Step 1: Login to Portfolio Visualizer
         # ========================================================================
         print("\n=== Step 1: Logging in ===")
-        try:
-            # Get credentials from environment variables
-            username = os.getenv("LOGIN_USERNAME")
-            password = os.getenv("LOGIN_PWD")
-
-            if not username or not password:
-                print("Error: Login credentials not found in .env file")
-                print("Please create a .env file with LOGIN_USERNAME and " "LOGIN_PWD")
-                raise Exception("Login credentials not found")
-
-            # Navigate to login page
-            login_url = "https://www.portfoliovisualizer.com/login"
-            print(f"Navigating to login page: {login_url}")
-            driver.get(login_url)
-            time.sleep(2)
-
-            # Find and fill username field
-            username_field = None
+        if restore_login_session(driver, profile_in_use=profile_in_use):
+            print("Skipping login form")
+        else:
             try:
-                username_field = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "email"))
-                )
-            except Exception:
-                try:
-                    username_field = driver.find_element(By.NAME, "email")
-                except Exception:
-                    username_field = driver.find_element(
-                        By.XPATH, "//input[@type='email']"
-                    )
-
-            if username_field:
-                username_field.clear()
-                username_field.send_keys(username)
+                # Get credentials from environment variables
+                username = os.getenv("LOGIN_USERNAME")
+                password = os.getenv("LOGIN_PWD")
+
+                if not username or not password:
+                    print("Error: Login credentials not found in .env file")
+                    print("Please create a .env file with LOGIN_USERNAME and " "LOGIN_PWD")
+                    raise Exception("Login credentials not found")
+
+                # Navigate to login page
+                login_url = "https://www.portfoliovisualizer.com/login"
+                print(f"Navigating to login page: {login_url}")
+                driver.get(login_url)
+
+                # Find and fill username field
+                username_field = find_one(driver, EMAIL_FIELD_SELECTORS)
+                set_input_value(driver, username_field, username)
                 print(f"Entered username: {username}")
-                time.sleep(0.5)
-            else:
-                raise Exception("Could not find username field")
 
-            # Find and fill password field
-            password_field = None
-            try:
-                password_field = driver.find_element(By.ID, "password")
-            except Exception:
-                try:
-                    password_field = driver.find_element(By.NAME, "password")
-                except Exception:
-                    password_field = driver.find_element(
-                        By.XPATH, "//input[@type='password']"
-                    )
-
-            if password_field:
-                password_field.clear()
-                password_field.send_keys(password)
+                # Find and fill password field
+                password_field = find_one(
+                    driver, PASSWORD_FIELD_SELECTORS, timeout=2
+                )
+                set_input_value(driver, password_field, password)
                 print("Entered password")
-                time.sleep(0.5)
-            else:
-                raise Exception("Could not find password field")
 
-            # Find and click submit button
-            submit_button = None
-            try:
-                submit_button = driver.find_element(
-                    By.XPATH, "//button[@type='submit']"
+                # Find and click submit button
+                submit_button = find_one(
+                    driver,
+                    SUBMIT_BUTTON_SELECTORS,
+                    timeout=2,
+                    button_text=SUBMIT_BUTTON_TEXT,
                 )
-            except Exception:
-                try:
-                    submit_button = driver.find_element(
-                        By.XPATH, "//input[@type='submit']"
-                    )
-                except Exception:
-                    submit_button = driver.find_element(
-                        By.XPATH,
-                        "//button[contains(text(), 'Login') or "
-                        "contains(text(), 'Sign In')]",
-                    )
 
-            if submit_button:
-                try:
-                    submit_button.click()
-                except Exception:
-                    driver.execute_script(
-                        "arguments[0].click();", submit_button
-                    )
-                print("Clicked login submit button")
-                time.sleep(3)
-
-                # Check if login was successful
-                try:
-                    WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located(
-                            (By.ID, "accountDropdown")
+                if submit_button:
+                    try:
+                        submit_button.click()
+                    except Exception:
+                        driver.execute_script(
+                            "arguments[0].click();", submit_button
                         )
-                    )
-                    print("✓ Login successful - account dropdown found")
-                except Exception:
-                    print(
-                        "Warning: Login may have failed - account dropdown "
-                        "not found after login"
-                    )
-                    print("Continuing anyway...")
-            else:
-                raise Exception("Could not find submit button")
+                    print("Clicked login submit button")
+                    prefetch_backtest_page(driver)
 
-        except Exception as e:
-            print(f"Error during login: {e}")
-            import traceback
+                    # Check if login was successful
+                    try:
+                        WebDriverWait(driver, 15).until(
+                            EC.presence_of_element_located(
+                                (By.ID, "accountDropdown")
+                            )
+                        )
+                        print("✓ Login successful - account dropdown found")
+                        save_session_cookies(driver)
+                    except Exception:
+                        print(
+                            "Warning: Login may have failed - account dropdown "
+                            "not found after login"
+                        )
+                        print("Continuing anyway...")
+                else:
+                    raise Exception("Could not find submit button")
 
-            traceback.print_exc()
-            raise
+            except Exception as e:
+                print(f"Error during login: {e}")
+                traceback.print_exc()
+                raise
 
         # ========================================================================
         # Step 2: Navigate to Backtest Page
         # ========================================================================
         print("\n=== Step 2: Navigating to backtest page ===")
-        url = "https://www.portfoliovisualizer.com/" "backtest-asset-class-allocation"
-        driver.get(url)
-        print(f"Navigated to: {url}")
-        time.sleep(3)
+        url = BACKTEST_URL
+        if driver.current_url.split("?")[0] == url:
+            # A restored session is checked on this page already
+            print(f"Already on: {url}")
+        else:
+            driver.get(url)
+            print(f"Navigated to: {url}")
+        clear_element_cache()
 
         # ========================================================================
         # Step 3: Set Start Year to 1998
         # ========================================================================
         print("\n=== Step 3: Setting start year to 1998 ===")
         try:
-            # Step 1: Click the button to open the modal
-            modal_button = WebDriverWait(driver, 10).until(
+            # Step 1: Click the button to open the modal (waiting for it
+            # also covers the page load)
+            modal_button = WebDriverWait(driver, 15).until(
                 EC.presence_of_element_located(
                     (
                         By.CSS_SELECTOR,
@@ -727,7 +1405,6 @@ def main(allocations_file=None, output_alias=None):
             driver.execute_script(
                 "arguments[0].scrollIntoView({block: 'center'});", modal_button
             )
-            time.sleep(1)
 
             # Try regular click first
             try:
@@ -738,46 +1415,26 @@ def main(allocations_file=None, output_alias=None):
                 driver.execute_script("arguments[0].click();", modal_button)
                 print("Clicked button to open modal (JavaScript click)")
 
-            time.sleep(2)
-
             # Step 2: Wait for modal to appear
             WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "#custom-data-body"))
             )
             print("Modal appeared")
-            time.sleep(1)
 
             # Step 3: Click the Settings tab
-            settings_tab = None
             try:
-                settings_tab = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable(
-                        (
-                            By.CSS_SELECTOR,
-                            "#inputSettings_btn[aria-selected='false']",
-                        )
-                    )
+                settings_tab = find_one(
+                    driver,
+                    [
+                        "#inputSettings_btn[aria-selected='false']",
+                        "#inputSettings_btn",
+                    ],
+                    timeout=5,
                 )
-                print("Found Settings tab (aria-selected=false)")
-            except Exception:
-                try:
-                    settings_tab = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable(
-                            (By.CSS_SELECTOR, "#inputSettings_btn")
-                        )
-                    )
-                    print(
-                        "Found Settings tab (any aria-selected value)"
-                    )
-                except Exception:
-                    try:
-                        settings_tab = driver.find_element(
-                            By.XPATH, "//button[@id='inputSettings_btn']"
-                        )
-                        print("Found Settings tab (by XPath)")
-                    except Exception as e:
-                        print(f"Could not find Settings tab. Error: {e}")
-                        raise
+                print("Found Settings tab")
+            except Exception as e:
+                print(f"Could not find Settings tab. Error: {e}")
+                raise
 
             # Click the Settings tab
             if settings_tab:
@@ -786,7 +1443,7 @@ def main(allocations_file=None, output_alias=None):
                 except Exception:
                     driver.execute_script("arguments[0].click();", settings_tab)
                 print("Clicked Settings tab")
-                time.sleep(1)
+                wait_for_tab_selected(driver, "inputSettings_btn")
 
             # Step 4: Modify the StartYear field to 1998
             start_year_set = select_dropdown_value(
@@ -796,37 +1453,32 @@ def main(allocations_file=None, output_alias=None):
             if not start_year_set:
                 raise Exception("Could not set start year using any method")
 
-            time.sleep(1)
-
-            # Step 5: Navigate back to Portfolio Assets tab
-            portfolio_assets_tab = None
+            # Confirm the page took the new value before leaving the tab
             try:
-                portfolio_assets_tab = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable(
-                        (
-                            By.CSS_SELECTOR,
-                            "#inputAssets_btn[aria-selected='false']",
-                        )
+                WebDriverWait(driver, 3).until(
+                    lambda d: d.execute_script(
+                        "return document.querySelector('#startYear').value;"
                     )
+                    == "1998"
                 )
-                print("Found Portfolio Assets tab (aria-selected=false)")
+                print("Verified start year is 1998")
             except Exception:
-                try:
-                    portfolio_assets_tab = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable(
-                            (By.CSS_SELECTOR, "#inputAssets_btn")
-                        )
-                    )
-                    print("Found Portfolio Assets tab (any aria-selected value)")
-                except Exception:
-                    try:
-                        portfolio_assets_tab = driver.find_element(
-                            By.XPATH, "//button[@id='inputAssets_btn']"
-                        )
-                        print("Found Portfolio Assets tab (by XPath)")
-                    except Exception as e:
-                        print(f"Could not find Portfolio Assets tab. Error: {e}")
-                        raise
+                print("Warning: #startYear does not report 1998; continuing")
+
+            # Step 5: Navigate back to Portfolio Assets tab
+            try:
+                portfolio_assets_tab = find_one(
+                    driver,
+                    [
+                        "#inputAssets_btn[aria-selected='false']",
+                        "#inputAssets_btn",
+                    ],
+                    timeout=5,
+                )
+                print("Found Portfolio Assets tab")
+            except Exception as e:
+                print(f"Could not find Portfolio Assets tab. Error: {e}")
+                raise
 
             # Click the Portfolio Assets tab
             if portfolio_assets_tab:
@@ -835,12 +1487,10 @@ def main(allocations_file=None, output_alias=None):
                 except Exception:
                     driver.execute_script("arguments[0].click();", portfolio_assets_tab)
                 print("Navigated back to Portfolio Assets tab")
-                time.sleep(1)
+                wait_for_tab_selected(driver, "inputAssets_btn")
 
         except Exception as e:
             print(f"Error setting start year via modal: {e}")
-            import traceback
-
             traceback.print_exc()
 
         # ========================================================================
@@ -867,295 +1517,275 @@ def main(allocations_file=None, output_alias=None):
 
         except Exception as e:
             print(f"Error setting benchmark: {e}")
-            import traceback
-
             traceback.print_exc()
 
-        # ========================================================================
-        # Step 5: Add More Rows
-        # ========================================================================
-        print("\n=== Step 5: Adding more rows ===")
-        try:
-            # Find the "More" link by its onclick attribute
-            more_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "//a[contains(@onclick, 'addAssetRows') and "
-                        "contains(text(), 'More')]",
-                    )
-                )
-            )
+    except Exception:
+        driver.quit()
+        raise
 
-            # Scroll into view
-            driver.execute_script(
-                "arguments[0].scrollIntoView({block: 'center'});", more_button
-            )
-            time.sleep(0.5)
+    return driver
 
-            # Click the More button
-            try:
-                more_button.click()
-                print("Clicked 'More' button to add rows")
-            except Exception:
-                # Try JavaScript click if regular click fails
-                driver.execute_script("arguments[0].click();", more_button)
-                print("Clicked 'More' button (JavaScript)")
 
-            time.sleep(1)  # Wait for rows to be added
+def run_one_backtest(driver, allocations_file=None, output_alias=None):
+    """Enter allocations, run the backtest and download results (Steps 6-8)
 
-        except Exception as e:
-            print(f"Warning: Could not click 'More' button: {e}")
-            print("Continuing with existing rows...")
+    Args:
+        driver: WebDriver returned by setup_session (or left on the
+            backtest page by a previous run_one_backtest call)
+        allocations_file: Path to CSV file with portfolio allocations.
+                         If None, uses default portfolio_allocations.csv
+        output_alias: Alias for the output file (e.g., 'coarse_grid').
+                     If None, uses timestamp-based naming
 
-        # ========================================================================
-        # Step 6: Load and Enter Portfolio Allocations
-        # ========================================================================
-        print("\n=== Step 6: Loading and entering portfolio allocations ===")
+    Returns:
+        Path to results file
+    """
 
-        # Use provided allocations file or default
-        if allocations_file:
-            csv_path = allocations_file
-        else:
-            csv_path = os.path.join(project_dir, "portfolio_allocations.csv")
+    # Get project directory
+    project_dir = os.path.dirname(os.path.abspath(__file__))
 
-        try:
-            df_portfolio = pd.read_csv(csv_path)
-            print(f"Loaded portfolio allocations from: {csv_path}")
-
-            # Detect file format: check if columns start with Grid_ or Portfolio_
-            portfolio_cols = [col for col in df_portfolio.columns
-                            if col.startswith('Grid_') or col.startswith('Portfolio_')]
-
-            num_portfolios = len(portfolio_cols)
-            print(f"Detected {num_portfolios} portfolios in CSV")
-
-            # Check Portfolio Visualizer limits (max 3 portfolios at a time)
-            if num_portfolios > 3:
-                print(f"\nWarning: Portfolio Visualizer supports max 3 portfolios per backtest")
-                print(f"This file has {num_portfolios} portfolios.")
-                print(f"Processing first 3 portfolios only.")
-                print(f"To backtest all portfolios, upload the CSV directly to Portfolio Visualizer")
-                print(f"and download the results manually.")
-                portfolio_cols = portfolio_cols[:3]
-                num_portfolios = 3
-
-            # Show sample of data
-            if num_portfolios <= 10:
-                print("\nPortfolio Allocations CSV (first few columns):")
-                cols_to_show = ['Asset_Description'] + portfolio_cols[:min(5, len(portfolio_cols))]
-                print(df_portfolio[cols_to_show].to_string(index=False))
-
-            # For grid format, we need to determine asset class mappings
-            # Check if Asset_Class_Option_Value column exists
-            if 'Asset_Class_Option_Value' in df_portfolio.columns:
-                # Old format with explicit option values
-                asset_class_mappings = {}
-                for _, row in df_portfolio.iterrows():
-                    asset_num = int(row["Asset_Number"])
-                    option_value = row["Asset_Class_Option_Value"]
-                    asset_class_mappings[asset_num] = option_value
-            else:
-                # New grid format - infer from Asset_Description
-                asset_description_to_option = {
-                    'US Equities - US Stock Market': 'TotalStockMarket',
-                    'Foreign Developed Equities - Intl Developed ex-US Market': 'IntlDeveloped',
-                    'Emerging Market Equities - Emerging Markets': 'EmergingMarket',
-                    'US Treasuries - Intermediate Term Treasury': 'IntermediateTreasury',
-                    'TIPS - Inflation-Protected Bonds': 'TIPS',
-                    'Corporate Bonds - Investment Grade Corporate Bonds': 'CorpBond',
-                    'Real Estate/REITs - US REIT': 'REIT',
-                }
+    # The form keeps its settings between runs; only the allocations from
+    # a previous run need clearing
+    clear_allocation_fields(driver)
 
-                asset_class_mappings = {}
-                for idx, row in df_portfolio.iterrows():
-                    asset_num = idx + 1  # Asset numbers are 1-indexed
-                    asset_desc = row['Asset_Description']
-                    if asset_desc in asset_description_to_option:
-                        asset_class_mappings[asset_num] = asset_description_to_option[asset_desc]
-                    else:
-                        print(f"Warning: Unknown asset description: {asset_desc}")
-
-            # Extract portfolio allocations from CSV
-            portfolio_allocations = {}
-            for idx, row in df_portfolio.iterrows():
-                asset_num = idx + 1  # Asset numbers are 1-indexed
-                # Read allocations for each portfolio column
-                for portfolio_idx, col_name in enumerate(portfolio_cols, start=1):
-                    if col_name in row and pd.notna(row[col_name]):
-                        allocation = float(row[col_name])
-                        if allocation > 0:  # Only include non-zero allocations
-                            portfolio_allocations[(asset_num, portfolio_idx)] = allocation
-
-            print(f"\nLoaded {len(asset_class_mappings)} asset classes")
-            print(f"Loaded {len(portfolio_allocations)} allocation entries")
-            print(f"Processing {num_portfolios} portfolios")
-
-        except FileNotFoundError:
-            print(f"Warning: CSV file not found at {csv_path}")
-            print("Creating default CSV file...")
-
-            # Create default CSV with current allocations
-            default_data = {
-                "Asset_Number": [1, 2, 3, 4, 5, 6, 7],
-                "Asset_Class_Option_Value": [
-                    "TotalStockMarket",
-                    "IntlDeveloped",
-                    "EmergingMarket",
-                    "IntermediateTreasury",
-                    "TIPS",
-                    "CorpBond",
-                    "REIT",
-                ],
-                "Asset_Description": [
-                    "US Equities - US Stock Market",
-                    "Foreign Developed Equities - Intl Developed ex-US Market",
-                    "Emerging Market Equities - Emerging Markets",
-                    "US Treasuries - Intermediate Term Treasury",
-                    "TIPS - Inflation-Protected Bonds",
-                    "Corporate Bonds - Investment Grade Corporate Bonds",
-                    "Real Estate/REITs - US REIT",
-                ],
-                "Portfolio_1": [30.0, 15.0, 8.0, 10.0, 15.0, 7.5, 14.5],
-                "Portfolio_2": [20.0, 15.0, 8.0, 20.0, 15.0, 7.5, 14.5],
-                "Portfolio_3": [40.0, 15.0, 8.0, 0.0, 15.0, 7.5, 14.5],
-            }
-            df_default = pd.DataFrame(default_data)
-            df_default.to_csv(csv_path, index=False)
-            print(f"Created default CSV file at: {csv_path}")
-            print("Please edit this file and re-run the script.")
-            raise Exception("CSV file not found - created default file")
+    # ========================================================================
+    # Step 6: Load and Enter Portfolio Allocations
+    # ========================================================================
+    print("\n=== Step 6: Loading and entering portfolio allocations ===")
 
-        except Exception as e:
-            print(f"Error loading CSV file: {e}")
-            import traceback
+    # Use provided allocations file or default
+    if allocations_file:
+        csv_path = allocations_file
+    else:
+        csv_path = os.path.join(project_dir, "portfolio_allocations.csv")
 
-            traceback.print_exc()
-            raise
-
-        # Validate portfolio weights
-        print("\n=== Validating Portfolio Weights ===")
-        validate_portfolio_weights(portfolio_allocations)
-
-        # Set asset classes first (before entering allocations)
-        print("\n=== Setting Asset Classes ===")
-        for asset_num, option_value in asset_class_mappings.items():
-            set_asset_class(driver, asset_num, option_value)
-            time.sleep(0.3)  # Brief pause between selections
-
-        # Enter portfolio allocations
-        print("\n=== Entering Portfolio Allocations ===")
-        for (asset_num, portfolio_num), allocation in (
-            portfolio_allocations.items()
-        ):
-            enter_portfolio_allocation(
-                driver, asset_num, portfolio_num, allocation
-            )
-            time.sleep(0.2)  # Brief pause between entries
+    try:
+        # The file is a handful of rows, so read it with the csv module
+        # rather than building a DataFrame
+        with open(csv_path, newline='') as f:
+            reader = csv.DictReader(f)
+            columns = reader.fieldnames or []
+            rows = list(reader)
+        print(f"Loaded portfolio allocations from: {csv_path}")
+
+        # Detect file format: check if columns start with Grid_ or Portfolio_
+        portfolio_cols = [col for col in columns
+                        if col.startswith('Grid_') or col.startswith('Portfolio_')]
+
+        num_portfolios = len(portfolio_cols)
+        print(f"Detected {num_portfolios} portfolios in CSV")
+
+        # Check Portfolio Visualizer limits (max 3 portfolios at a time)
+        if num_portfolios > 3:
+            print(f"\nWarning: Portfolio Visualizer supports max 3 portfolios per backtest")
+            print(f"This file has {num_portfolios} portfolios.")
+            print(f"Processing first 3 portfolios only.")
+            print(f"To backtest all portfolios, upload the CSV directly to Portfolio Visualizer")
+            print(f"and download the results manually.")
+            portfolio_cols = portfolio_cols[:3]
+            num_portfolios = 3
+
+        # Show sample of data
+        if num_portfolios <= 10:
+            print("\nPortfolio Allocations CSV (first few columns):")
+            cols_to_show = ['Asset_Description'] + portfolio_cols[:min(5, len(portfolio_cols))]
+            print(pd.DataFrame(rows, columns=cols_to_show).to_string(index=False))
+
+        # For grid format, we need to determine asset class mappings
+        # Check if Asset_Class_Option_Value column exists
+        if 'Asset_Class_Option_Value' in columns:
+            # Old format with explicit option values
+            asset_class_mappings = {
+                int(float(row["Asset_Number"])): row["Asset_Class_Option_Value"]
+                for row in rows
+            }
+        else:
+            # New grid format - infer from Asset_Description
+            # Asset numbers are 1-indexed
+            asset_descs = [row['Asset_Description'] for row in rows]
+            asset_class_mappings = {
+                asset_num: ASSET_DESCRIPTION_TO_OPTION[asset_desc]
+                for asset_num, asset_desc in enumerate(asset_descs, start=1)
+                if asset_desc in ASSET_DESCRIPTION_TO_OPTION
+            }
+            for asset_desc in asset_descs:
+                if asset_desc not in ASSET_DESCRIPTION_TO_OPTION:
+                    print(f"Warning: Unknown asset description: {asset_desc}")
+
+        # Extract portfolio allocations from CSV as one (assets x portfolios)
+        # array; blank cells become NaN, and only non-zero allocations are
+        # kept (NaN fails the > 0 test)
+        weights = np.array(
+            [[(row.get(col_name) or '').strip() or 'nan' for col_name in portfolio_cols]
+             for row in rows],
+            dtype=np.float64,
+        ).reshape(len(rows), len(portfolio_cols))
+        asset_idx, portfolio_idx = np.nonzero(weights > 0)
+        portfolio_allocations = {
+            (int(a) + 1, int(p) + 1): float(weights[a, p])
+            for a, p in zip(asset_idx, portfolio_idx)
+        }
 
-        print("\nPortfolio setup completed successfully")
+        print(f"\nLoaded {len(asset_class_mappings)} asset classes")
+        print(f"Loaded {len(portfolio_allocations)} allocation entries")
+        print(f"Processing {num_portfolios} portfolios")
 
-        # ========================================================================
-        # Step 7: Run Backtest
-        # ========================================================================
-        print("\n=== Step 7: Running backtest ===")
-        try:
-            # Find the submit button by ID
-            analyze_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "submitButton"))
-            )
+    except FileNotFoundError:
+        print(f"Warning: CSV file not found at {csv_path}")
+        print("Creating default CSV file...")
 
-            # Scroll into view
-            driver.execute_script(
-                "arguments[0].scrollIntoView({block: 'center'});",
-                analyze_button,
-            )
-            time.sleep(0.5)
+        # Create default CSV with current allocations
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(DEFAULT_PORTFOLIO_HEADER)
+            writer.writerows(DEFAULT_PORTFOLIO_ROWS)
+        print(f"Created default CSV file at: {csv_path}")
+        print("Please edit this file and re-run the script.")
+        raise Exception("CSV file not found - created default file")
 
-            # Click the button
-            try:
-                analyze_button.click()
-                print("Clicked 'Analyze Portfolios' button")
-            except Exception:
-                # Try JavaScript click if regular click fails
-                driver.execute_script("arguments[0].click();", analyze_button)
-                print("Clicked 'Analyze Portfolios' button (JavaScript)")
+    except Exception as e:
+        print(f"Error loading CSV file: {e}")
+        traceback.print_exc()
+        raise
+
+    # Validate portfolio weights
+    print("\n=== Validating Portfolio Weights ===")
+    validate_portfolio_weights(portfolio_allocations)
+
+    # Add rows only if the file has more assets than the form shows
+    ensure_asset_rows(
+        driver,
+        max(
+            [*asset_class_mappings, *(asset for asset, _ in portfolio_allocations)],
+            default=0,
+        ),
+    )
 
-            # Wait for results to load
-            print("Waiting for results to load...")
-            time.sleep(5)
+    # Set asset classes first (before entering allocations)
+    # and enter portfolio allocations, all in one browser round trip
+    print("\n=== Setting Asset Classes and Portfolio Allocations ===")
+    fill_portfolio_form(driver, asset_class_mappings, portfolio_allocations)
 
-            # Wait for results table to appear
-            WebDriverWait(driver, 30).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "table"))
-            )
-            print("Results loaded successfully")
+    print("\nPortfolio setup completed successfully")
 
-        except Exception as e:
-            print(f"Error running analysis: {e}")
-            import traceback
+    # ========================================================================
+    # Step 7: Run Backtest
+    # ========================================================================
+    print("\n=== Step 7: Running backtest ===")
+    try:
+        # Results of a previous run on this page, if any
+        previous_link = driver.execute_script(EXCEL_LINK_SCRIPT)
 
-            traceback.print_exc()
+        # Find the submit button by ID
+        analyze_button = WebDriverWait(driver, 10).until(
+            EC.element_to_be_clickable((By.ID, "submitButton"))
+        )
 
-        # ========================================================================
-        # Step 8: Download Excel Results
-        # ========================================================================
-        print("\n=== Step 8: Downloading Excel results ===")
-        # Chrome downloads to this directory
-        chrome_download_dir = os.path.join(project_dir, "downloads")
-        # Save to data/source_tables for processing
-        excel_output_dir = os.path.join(project_dir, "data", "source_tables")
-        os.makedirs(excel_output_dir, exist_ok=True)
-
-        # Determine output filename based on alias
-        if output_alias:
-            output_filename = f"portfolio_backtest_results_{output_alias}.xlsx"
-        else:
-            output_filename = "portfolio_backtest_results.xlsx"
+        # Scroll into view
+        driver.execute_script(
+            "arguments[0].scrollIntoView({block: 'center'});",
+            analyze_button,
+        )
 
-        # Download with aliased filename
-        excel_file = download_excel_results(
-            driver,
-            chrome_download_dir,
-            output_filename,
+        # Click the button
+        try:
+            analyze_button.click()
+            print("Clicked 'Analyze Portfolios' button")
+        except Exception:
+            # Try JavaScript click if regular click fails
+            driver.execute_script("arguments[0].click();", analyze_button)
+            print("Clicked 'Analyze Portfolios' button (JavaScript)")
+
+        # Wait for results to load. The input form is itself a .table,
+        # so wait for the results' Excel download link instead
+        print("Waiting for results to load...")
+        find_excel_link(driver, wait_time=35, previous=previous_link)
+        WebDriverWait(driver, 5).until(
+            EC.presence_of_element_located((By.CLASS_NAME, "table"))
         )
+        print("Results loaded successfully")
 
-        if excel_file:
-            # Move file from downloads directory to data/source_tables
-            try:
-                filename = os.path.basename(excel_file)
-                final_path = os.path.join(excel_output_dir, filename)
-                # Don't remove existing files - preserve historical data
-                # If file exists, add a counter to make it unique
-                if os.path.exists(final_path):
-                    base_name, ext = os.path.splitext(filename)
-                    counter = 1
-                    while os.path.exists(final_path):
-                        final_path = os.path.join(
-                            excel_output_dir, f"{base_name}_{counter}{ext}"
-                        )
-                        counter += 1
-                shutil.move(excel_file, final_path)
-                print(f"\n✓ Excel file saved to: {final_path}")
+    except Exception as e:
+        print(f"Error running analysis: {e}")
+        traceback.print_exc()
 
-                # Return the final path for the orchestrator to use
-                return final_path
-            except Exception as e:
-                print(f"\n✓ Excel file downloaded to: {excel_file}")
-                print(f"Warning: Could not move to custom directory: {e}")
-                return excel_file
-        else:
-            print("\n✗ Failed to download Excel file")
-            return None
+    # ========================================================================
+    # Step 8: Download Excel Results
+    # ========================================================================
+    print("\n=== Step 8: Downloading Excel results ===")
+    # Chrome downloads to this directory
+    chrome_download_dir = os.path.join(project_dir, "downloads")
+    # Save to data/source_tables for processing
+    excel_output_dir = os.path.join(project_dir, "data", "source_tables")
+    os.makedirs(excel_output_dir, exist_ok=True)
+
+    # Determine output filename based on alias
+    if output_alias:
+        output_filename = f"portfolio_backtest_results_{output_alias}.xlsx"
+    else:
+        output_filename = "portfolio_backtest_results.xlsx"
+
+    # Download with aliased filename
+    excel_file = download_excel_results(
+        driver,
+        chrome_download_dir,
+        output_filename,
+    )
 
-        print("\n=== Script completed successfully ===")
+    if excel_file:
+        # Move file from downloads directory to data/source_tables
+        try:
+            filename = os.path.basename(excel_file)
+            final_path = os.path.join(excel_output_dir, filename)
+            # Don't remove existing files - preserve historical data
+            # If file exists, add a counter to make it unique
+            final_path = unique_output_path(excel_output_dir, filename)
+            shutil.move(excel_file, final_path)
+            print(f"\n✓ Excel file saved to: {final_path}")
+
+            # Return the final path for the orchestrator to use
+            return final_path
+        except Exception as e:
+            print(f"\n✓ Excel file downloaded to: {excel_file}")
+            print(f"Warning: Could not move to custom directory: {e}")
+            return excel_file
+    else:
+        print("\n✗ Failed to download Excel file")
+        return None
 
-    finally:
-        # Close the browser
-        print("\nClosing browser...")
-        driver.quit()
-        print("Browser closed")
 
+def main(allocations_file=None, output_alias=None, headless=True, driver=None):
+    """Main execution function
+
+    Args:
+        allocations_file: Path to CSV file with portfolio allocations.
+                         If None, uses default portfolio_allocations.csv
+        output_alias: Alias for the output file (e.g., 'coarse_grid').
+                     If None, uses timestamp-based naming
+        headless: Run Chrome in headless mode (default: True)
+        driver: Optional session from setup_session to reuse. It is left
+            open for the caller; otherwise a new session is started and
+            closed when done
+
+    Returns:
+        Path to results file
+    """
+    owns_driver = driver is None
+    if owns_driver:
+        driver = setup_session(headless=headless)
+
+    try:
+        result_file = run_one_backtest(driver, allocations_file, output_alias)
+        if result_file:
+            print("\n=== Script completed successfully ===")
+        return result_file
+
+    finally:
+        if owns_driver:
+            # Close the browser
+            print("\nClosing browser...")
+            driver.quit()
+            print("Browser closed")
 
 if __name__ == "__main__":
     import argparse
@@ -1175,10 +1805,26 @@ if __name__ == "__main__":
         default=None,
         help='Alias for output file (e.g., "coarse_grid", "fine_grid")'
     )
+    parser.add_argument(
+        '--headless',
+        action='store_true',
+        default=True,
+        help='Run Chrome in headless mode (default)'
+    )
+    parser.add_argument(
+        '--no-headless',
+        dest='headless',
+        action='store_false',
+        help='Show the Chrome window'
+    )
 
     args = parser.parse_args()
 
-    result_file = main(allocations_file=args.allocations, output_alias=args.alias)
+    result_file = main(
+        allocations_file=args.allocations,
+        output_alias=args.alias,
+        headless=args.headless,
+    )
     if result_file:
         print(f"\n{'='*80}")
         print(f"BACKTEST RESULTS FILE:")
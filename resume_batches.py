@@ -1,15 +1,31 @@
 #!/usr/bin/env python3
 """Simple script to resume batch processing from 118-192"""
+import argparse
 import subprocess
 import sys
 
 python_path = "/opt/anaconda3/envs/berkeley_240/bin/python"
 script = "run_batch_backtest_optimized.py"
 
-# Run without headless mode
-cmd = [python_path, script, "--start-batch", "118", "--no-headless"]
+parser = argparse.ArgumentParser(description='Resume batch processing')
+parser.add_argument('--start-batch', type=int, default=118)
+parser.add_argument('--end-batch', type=int, default=None)
+parser.add_argument('--workers', type=int, default=4,
+                    help='Number of parallel browser sessions (default: 4)')
+args = parser.parse_args()
 
-print("Starting batch processing from batch 118...")
+# Run without headless mode. A single runner spreads the batches over
+# --workers browser sessions itself (one login and download directory per
+# worker). Its one worker pool owns the manifest file: the parent process
+# appends a row as each batch finishes. Separate runners over split ranges
+# would append to the same file concurrently.
+cmd = [python_path, script, "--start-batch", str(args.start_batch),
+       "--workers", str(args.workers), "--no-headless"]
+if args.end_batch is not None:
+    cmd += ["--end-batch", str(args.end_batch)]
+
+print(f"Starting batch processing from batch {args.start_batch} "
+      f"with {args.workers} workers...")
 print(f"Command: {' '.join(cmd)}")
 
 result = subprocess.run(cmd)
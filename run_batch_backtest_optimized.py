@@ -6,11 +6,18 @@ Uses a single persistent browser session to process all batches without
 re-authentication. Runs in headless mode for efficiency.
 """
 
+import numpy as np
 import pandas as pd
 import os
 import sys
+import shutil
 import time
+import traceback
+import uuid
 import argparse
+import csv
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import util as mp_util
 from pathlib import Path
 from datetime import datetime
 from selenium import webdriver
@@ -18,7 +25,6 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
 
 # Load environment
@@ -26,54 +32,107 @@ load_dotenv()
 
 # Import the backtest functions
 from portfolio_backtest import (
+    BACKTEST_URL,
+    EMAIL_FIELD_SELECTORS,
+    EXCEL_LINK_SCRIPT,
+    PASSWORD_FIELD_SELECTORS,
+    SUBMIT_BUTTON_SELECTORS,
+    SUBMIT_BUTTON_TEXT,
+    block_unneeded_requests,
+    build_chrome_options,
     select_dropdown_value,
-    set_asset_class,
-    enter_portfolio_allocation,
+    fill_portfolio_form,
     validate_portfolio_weights,
-    download_excel_results
+    download_excel_results,
+    clear_allocation_fields,
+    clear_element_cache,
+    find_element_by_id_cached,
+    find_excel_link,
+    find_one,
+    get_chromedriver_path,
+    ensure_asset_rows,
+    restore_login_session,
+    save_session_cookies,
+    set_input_value,
+    wait_for_tab_selected
 )
 
-
-def initialize_persistent_driver(headless=True):
-    """Initialize a persistent Chrome WebDriver with authentication."""
+# Asset class option values keyed by the Asset_Description of batch files
+ASSET_DESCRIPTION_TO_OPTION = {
+    'US Equities - US Stock Market': 'TotalStockMarket',
+    'Foreign Developed Equities - Intl Developed ex-US Market': 'IntlDeveloped',
+    'Emerging Market Equities - Emerging Markets': 'EmergingMarket',
+    'US Treasuries - Short Term Treasury': 'ShortTreasury',
+    'US Treasuries - Intermediate Term Treasury': 'IntermediateTreasury',
+    'US Treasuries - 10-year Treasury': 'TreasuryNotes',
+    'US Treasuries - Long Term Treasury': 'LongTreasury',
+    'TIPS - Inflation-Protected Bonds': 'TIPS',
+    'Corporate Bonds - Investment Grade Corporate Bonds': 'CorpBond',
+    'Real Estate/REITs - US REIT': 'REIT',
+}
+
+
+def initialize_persistent_driver(headless=True, download_dir=None, attach_port=None):
+    """Initialize a persistent Chrome WebDriver with authentication.
+
+    Args:
+        headless: Run Chrome in headless mode
+        download_dir: Directory Chrome saves downloads to
+            (default: <project>/downloads)
+        attach_port: Attach to an already running Chrome started with
+            --remote-debugging-port=<attach_port> instead of launching one.
+            A browser that is already logged in skips authentication, and
+            quitting the driver leaves that browser running
+    """
     print("="*80)
     print("INITIALIZING PERSISTENT BROWSER SESSION")
     print("="*80)
 
-    options = webdriver.ChromeOptions()
-
-    if headless:
-        options.add_argument('--headless=new')  # Use new headless mode
-        options.add_argument('--disable-gpu')
-        print("✓ Running in headless mode")
-
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-blink-features=AutomationControlled")
-
     # Configure download preferences
     project_dir = os.path.dirname(os.path.abspath(__file__))
-    download_dir = os.path.join(project_dir, "downloads")
+    if download_dir is None:
+        download_dir = os.path.join(project_dir, "downloads")
     os.makedirs(download_dir, exist_ok=True)
 
-    prefs = {
-        "download.default_directory": download_dir,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "safebrowsing.enabled": True,
-    }
-    options.add_experimental_option("prefs", prefs)
+    if attach_port:
+        # Launch flags and prefs cannot be changed on a running browser;
+        # downloads are redirected over CDP below
+        options = webdriver.ChromeOptions()
+        options.add_experimental_option("debuggerAddress", f"127.0.0.1:{attach_port}")
+        print(f"✓ Attaching to Chrome on port {attach_port}")
+    else:
+        # Same options as the single-run script (images off, unused browser
+        # services disabled)
+        options = build_chrome_options(download_dir, headless=headless)
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        if headless:
+            print("✓ Running in headless mode")
 
     # Create driver
+    # keep_alive reuses one HTTP connection to chromedriver for every command
     driver = webdriver.Chrome(
-        service=Service(ChromeDriverManager().install()),
-        options=options
+        service=Service(get_chromedriver_path()),
+        options=options,
+        keep_alive=True
     )
+    block_unneeded_requests(driver)
+    if attach_port:
+        driver.execute_cdp_cmd(
+            "Browser.setDownloadBehavior",
+            {"behavior": "allow", "downloadPath": download_dir},
+        )
 
     print("✓ Chrome WebDriver initialized")
 
     # Login once
     print("\n=== Authenticating to Portfolio Visualizer ===")
+    if attach_port and driver.find_elements(By.ID, "accountDropdown"):
+        print("✓ Attached browser is already logged in\n")
+        return driver
+    if restore_login_session(driver, profile_in_use=bool(attach_port)):
+        print("✓ Authentication successful\n")
+        return driver
+
     username = os.getenv("LOGIN_USERNAME")
     password = os.getenv("LOGIN_PWD")
 
@@ -82,60 +141,26 @@ def initialize_persistent_driver(headless=True):
 
     driver.get("https://www.portfoliovisualizer.com/login")
     print("Waiting for login page to load...")
-    time.sleep(1)  # Reduced from 3s - WebDriverWait handles the rest
 
     # Login
     try:
         print("Looking for username field...")
-        # Try multiple selectors for email field
-        username_field = None
-        try:
-            username_field = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "email"))
-            )
-        except:
-            try:
-                username_field = driver.find_element(By.NAME, "email")
-            except:
-                try:
-                    username_field = driver.find_element(By.XPATH, "//input[@type='email']")
-                except:
-                    username_field = driver.find_element(By.XPATH, "//input[@placeholder='Email address']")
-
+        username_field = find_one(driver, EMAIL_FIELD_SELECTORS)
         print("Found username field")
-        username_field.clear()
-        username_field.send_keys(username)
+        set_input_value(driver, username_field, username)
         print(f"Entered username: {username}")
 
         print("Looking for password field...")
-        # Try multiple selectors for password field
-        password_field = None
-        try:
-            password_field = driver.find_element(By.ID, "password")
-        except:
-            try:
-                password_field = driver.find_element(By.NAME, "password")
-            except:
-                try:
-                    password_field = driver.find_element(By.XPATH, "//input[@type='password']")
-                except:
-                    password_field = driver.find_element(By.XPATH, "//input[@placeholder='Password']")
-
+        password_field = find_one(driver, PASSWORD_FIELD_SELECTORS, timeout=2)
         print("Found password field")
-        password_field.clear()
-        password_field.send_keys(password)
+        set_input_value(driver, password_field, password)
         print("Entered password")
 
         print("Looking for submit button...")
-        # Try multiple selectors for submit button
-        submit_button = None
-        try:
-            submit_button = driver.find_element(By.XPATH, "//button[@type='submit']")
-        except:
-            try:
-                submit_button = driver.find_element(By.XPATH, "//button[contains(text(), 'Login')]")
-            except:
-                submit_button = driver.find_element(By.XPATH, "//input[@type='submit']")
+        submit_button = find_one(
+            driver, SUBMIT_BUTTON_SELECTORS, timeout=2,
+            button_text=SUBMIT_BUTTON_TEXT
+        )
 
         print("Found submit button - clicking...")
         submit_button.click()
@@ -146,6 +171,7 @@ def initialize_persistent_driver(headless=True):
             EC.presence_of_element_located((By.ID, "accountDropdown"))
         )
         print("✓ Authentication successful\n")
+        save_session_cookies(driver)
 
     except Exception as e:
         print(f"✗ Authentication failed: {e}")
@@ -162,147 +188,161 @@ def initialize_persistent_driver(headless=True):
     return driver
 
 
-def run_batch_with_persistent_session(driver, batch_file, batch_num, project_dir):
-    """Run a single batch using existing authenticated driver."""
+def load_batch_plan(df_batch):
+    """Turn a batch's allocations into the form values to enter.
+
+    Returns:
+        (asset_class_mappings, portfolio_allocations): {asset_num: option}
+        and {(asset_num, portfolio_num): allocation} for non-zero cells
+    """
+    portfolio_cols = [col for col in df_batch.columns
+                     if col.startswith('Grid_') or col.startswith('Portfolio_') or col.startswith('TreasuryGrid_')][:3]
+
+    # Asset classes; asset numbers are 1-based row positions, and rows with
+    # an unknown description are left unset
+    options = df_batch['Asset_Description'].map(ASSET_DESCRIPTION_TO_OPTION)
+    known = options.notna().to_numpy()
+    asset_class_mappings = dict(zip((np.flatnonzero(known) + 1).tolist(), options[known].tolist()))
+
+    # Allocations; NaN cells fail the > 0 test
+    weights = df_batch[portfolio_cols].to_numpy(dtype=np.float64)
+    asset_idx, portfolio_idx = np.nonzero(weights > 0)
+    portfolio_allocations = {
+        (int(a) + 1, int(p) + 1): float(weights[a, p])
+        for a, p in zip(asset_idx, portfolio_idx)
+    }
+
+    return asset_class_mappings, portfolio_allocations
+
+
+def form_is_configured(driver):
+    """Return True if the driver is on the backtest form with the start year
+    and benchmark already set by configure_backtest_form()."""
+    if driver.current_url.split("?")[0] != BACKTEST_URL:
+        return False
+    return driver.execute_script(
+        "const year = document.querySelector('#startYear');"
+        "const benchmark = document.querySelector('#benchmark');"
+        "return !!year && year.value === '1998' && !!benchmark"
+        " && benchmark.selectedIndex >= 0"
+        " && benchmark.options[benchmark.selectedIndex].text.includes('VFINX');"
+    )
+
+
+def configure_backtest_form(driver):
+    """Load the backtest page and set the start year (1998) and benchmark."""
+    # Navigate to backtest page
+    driver.get(BACKTEST_URL)
+    clear_element_cache()
+
+    # Configure start year (1998); waiting for the button covers the
+    # page load
+    modal_button = WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((
+            By.CSS_SELECTOR,
+            "#overview > div:nth-child(1) > div > div > div:nth-child(1) > table > tfoot > tr > td > button.btn.btn-outline-primary.me-3"
+        ))
+    )
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", modal_button)
+    driver.execute_script("arguments[0].click();", modal_button)
+
+    # Click Settings tab
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "#custom-data-body"))
+    )
+    settings_tab = find_element_by_id_cached(driver, "inputSettings_btn")
+    driver.execute_script("arguments[0].click();", settings_tab)
+    WebDriverWait(driver, 5).until(
+        EC.visibility_of_element_located((By.CSS_SELECTOR, "#startYear"))
+    )
+
+    # Set start year
+    select_dropdown_value(driver, "#startYear", "1998", by_value=True)
+
+    # Go back to Portfolio Assets tab
+    assets_tab = find_element_by_id_cached(driver, "inputAssets_btn")
+    driver.execute_script("arguments[0].click();", assets_tab)
+    wait_for_tab_selected(driver, "inputAssets_btn")
+
+    # Configure benchmark
+    select_dropdown_value(driver, "#benchmark", "Vanguard 500 Index Investor (VFINX)", by_value=False)
+
+
+def run_batch_with_persistent_session(driver, batch_df, batch_num, project_dir, download_dir=None):
+    """Run a single batch using existing authenticated driver.
+
+    Args:
+        batch_df: The batch's rows of the grid (Asset_Number,
+            Asset_Description and up to 3 portfolio columns)
+    """
 
     print(f"{'='*80}")
     print(f"PROCESSING BATCH {batch_num}")
     print(f"{'='*80}")
 
     try:
-        # Navigate to backtest page
-        driver.get("https://www.portfoliovisualizer.com/backtest-asset-class-allocation")
-        time.sleep(0.5)  # Reduced from 2s - WebDriverWait handles the rest
-
-        # Configure start year (1998)
-        modal_button = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((
-                By.CSS_SELECTOR,
-                "#overview > div:nth-child(1) > div > div > div:nth-child(1) > table > tfoot > tr > td > button.btn.btn-outline-primary.me-3"
-            ))
-        )
-        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", modal_button)
-        time.sleep(0.2)  # Reduced from 0.5s
-        driver.execute_script("arguments[0].click();", modal_button)
-        time.sleep(0.3)  # Reduced from 1s
-
-        # Click Settings tab
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "#custom-data-body"))
-        )
-        settings_tab = driver.find_element(By.ID, "inputSettings_btn")
-        driver.execute_script("arguments[0].click();", settings_tab)
-        time.sleep(0.2)  # Reduced from 0.5s
+        if form_is_configured(driver):
+            # Still on the form from the previous batch; only its
+            # allocations need clearing. The results may have re-rendered
+            # parts of the page, so look elements up afresh
+            print("Reusing the configured backtest form")
+            clear_element_cache()
+            clear_allocation_fields(driver)
+        else:
+            configure_backtest_form(driver)
 
-        # Set start year
-        select_dropdown_value(driver, "#startYear", "1998", by_value=True)
-        time.sleep(0.2)  # Reduced from 0.5s
+        # Load batch allocations
+        asset_class_mappings, portfolio_allocations = load_batch_plan(batch_df)
 
-        # Go back to Portfolio Assets tab
-        assets_tab = driver.find_element(By.ID, "inputAssets_btn")
-        driver.execute_script("arguments[0].click();", assets_tab)
-        time.sleep(0.2)  # Reduced from 0.5s
+        # Add more rows only if the batch has more assets than the form shows
+        ensure_asset_rows(
+            driver,
+            max([*asset_class_mappings, *(asset for asset, _ in portfolio_allocations)], default=0)
+        )
 
-        # Configure benchmark
-        select_dropdown_value(driver, "#benchmark", "Vanguard 500 Index Investor (VFINX)", by_value=False)
+        # Set asset classes and enter allocations in one browser round trip
+        fill_portfolio_form(driver, asset_class_mappings, portfolio_allocations)
 
-        # Add more rows
-        try:
-            more_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((
-                    By.XPATH,
-                    "//a[contains(@onclick, 'addAssetRows') and contains(text(), 'More')]"
-                ))
-            )
-            driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", more_button)
-            time.sleep(0.1)  # Reduced from 0.3s
-            driver.execute_script("arguments[0].click();", more_button)
-            time.sleep(0.2)  # Reduced from 0.5s
-        except:
-            pass
-
-        # Load batch allocations
-        df_batch = pd.read_csv(batch_file)
-        portfolio_cols = [col for col in df_batch.columns
-                         if col.startswith('Grid_') or col.startswith('Portfolio_') or col.startswith('TreasuryGrid_')][:3]
-
-        # Asset mapping
-        asset_description_to_option = {
-            'US Equities - US Stock Market': 'TotalStockMarket',
-            'Foreign Developed Equities - Intl Developed ex-US Market': 'IntlDeveloped',
-            'Emerging Market Equities - Emerging Markets': 'EmergingMarket',
-            'US Treasuries - Short Term Treasury': 'ShortTreasury',
-            'US Treasuries - Intermediate Term Treasury': 'IntermediateTreasury',
-            'US Treasuries - 10-year Treasury': 'TreasuryNotes',
-            'US Treasuries - Long Term Treasury': 'LongTreasury',
-            'TIPS - Inflation-Protected Bonds': 'TIPS',
-            'Corporate Bonds - Investment Grade Corporate Bonds': 'CorpBond',
-            'Real Estate/REITs - US REIT': 'REIT',
-        }
-
-        # Set asset classes
-        asset_class_mappings = {}
-        for idx, row in df_batch.iterrows():
-            asset_num = idx + 1
-            asset_desc = row['Asset_Description']
-            if asset_desc in asset_description_to_option:
-                asset_class_mappings[asset_num] = asset_description_to_option[asset_desc]
-
-        for asset_num, option_value in asset_class_mappings.items():
-            set_asset_class(driver, asset_num, option_value)
-            time.sleep(0.05)  # Reduced from 0.2s - just enough for DOM update
-
-        # Enter allocations
-        portfolio_allocations = {}
-        for idx, row in df_batch.iterrows():
-            asset_num = idx + 1
-            for portfolio_idx, col_name in enumerate(portfolio_cols, start=1):
-                if col_name in row and pd.notna(row[col_name]):
-                    allocation = float(row[col_name])
-                    if allocation > 0:
-                        portfolio_allocations[(asset_num, portfolio_idx)] = allocation
-
-        for (asset_num, portfolio_num), allocation in portfolio_allocations.items():
-            enter_portfolio_allocation(driver, asset_num, portfolio_num, allocation)
-            time.sleep(0.05)  # Reduced from 0.15s - just enough for DOM update
-
-        # Run backtest
-        analyze_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.ID, "submitButton"))
-        )
+        # Run backtest, remembering the link of any results already shown
+        previous_link = driver.execute_script(EXCEL_LINK_SCRIPT)
+        analyze_button = find_element_by_id_cached(driver, "submitButton", wait_time=10)
         driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", analyze_button)
-        time.sleep(0.1)  # Reduced from 0.3s
         driver.execute_script("arguments[0].click();", analyze_button)
 
-        # Wait for results
-        WebDriverWait(driver, 60).until(
+        # Wait for results. The form itself is a .table, and a reused form
+        # still shows the previous batch's results, so wait for a new Excel
+        # link first
+        find_excel_link(driver, wait_time=60, previous=previous_link)
+        WebDriverWait(driver, 5).until(
             EC.presence_of_element_located((By.CLASS_NAME, "table"))
         )
         print("✓ Backtest completed")
 
         # Download results
-        download_dir = os.path.join(project_dir, "downloads")
+        if download_dir is None:
+            download_dir = os.path.join(project_dir, "downloads")
         output_alias = f"batch_{batch_num:03d}"
         excel_file = download_excel_results(driver, download_dir, f"portfolio_backtest_results_{output_alias}.xlsx")
 
         if excel_file:
-            # Move to data/source_tables
+            # Move to data/source_tables (created once by main)
             excel_output_dir = os.path.join(project_dir, "data", "source_tables")
-            os.makedirs(excel_output_dir, exist_ok=True)
 
             filename = os.path.basename(excel_file)
             final_path = os.path.join(excel_output_dir, filename)
 
-            # Handle existing files
+            # The name already carries a timestamp; on the rare clash add a
+            # random suffix instead of probing _1, _2, ... one stat at a time
             if os.path.exists(final_path):
                 base_name, ext = os.path.splitext(filename)
-                counter = 1
-                while os.path.exists(final_path):
-                    final_path = os.path.join(excel_output_dir, f"{base_name}_{counter}{ext}")
-                    counter += 1
+                final_path = os.path.join(excel_output_dir, f"{base_name}_{uuid.uuid4().hex[:8]}{ext}")
 
-            import shutil
-            shutil.move(excel_file, final_path)
+            try:
+                # Atomic rename; downloads/ and data/ share a filesystem
+                os.replace(excel_file, final_path)
+            except OSError:
+                # e.g. a download directory on another filesystem
+                shutil.move(excel_file, final_path)
             print(f"✓ Results saved: {final_path}\n")
             return final_path
 
@@ -310,11 +350,67 @@ def run_batch_with_persistent_session(driver, batch_file, batch_num, project_dir
 
     except Exception as e:
         print(f"✗ Batch {batch_num} failed: {e}\n")
-        import traceback
         traceback.print_exc()
         return None
 
 
+MANIFEST_FIELDS = ['batch_num', 'portfolios', 'results_file']
+
+
+def append_manifest_row(manifest_file, row):
+    """Append one completed batch to the manifest, writing the header if the
+    file is new, so finished batches are recorded even if the run stops."""
+    write_header = not os.path.exists(manifest_file) or os.path.getsize(manifest_file) == 0
+    with open(manifest_file, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS, lineterminator='\n')
+        if write_header:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+# Per-process state for parallel workers: each worker owns one browser
+# session and its own download directory so downloads cannot be confused
+_worker_driver = None
+_worker_download_dir = None
+_worker_headless = True
+_worker_wait_time = 0
+
+
+def _init_worker(headless, wait_time=0):
+    """ProcessPoolExecutor initializer; the driver is created on first use."""
+    global _worker_headless, _worker_wait_time
+    _worker_headless = headless
+    _worker_wait_time = wait_time
+
+
+def _run_batch_in_worker(task):
+    """Run one (batch_num, batch_df, project_dir) task in a worker process."""
+    global _worker_driver, _worker_download_dir
+    batch_num, batch_df, project_dir = task
+
+    if _worker_driver is None:
+        _worker_download_dir = os.path.join(project_dir, "downloads", f"worker_{os.getpid()}")
+        try:
+            _worker_driver = initialize_persistent_driver(
+                headless=_worker_headless, download_dir=_worker_download_dir
+            )
+        except Exception as e:
+            # Leave the driver unset so the next task in this worker retries
+            print(f"✗ Batch {batch_num} failed: could not start browser session: {e}\n")
+            return None
+        # Quit the browser when the pool shuts this worker down
+        mp_util.Finalize(None, _worker_driver.quit, exitpriority=10)
+    elif _worker_wait_time > 0:
+        # Each session waits between its own batches, as the single-session
+        # loop does
+        print(f"Waiting {_worker_wait_time}s before next batch...\n")
+        time.sleep(_worker_wait_time)
+
+    return run_batch_with_persistent_session(
+        _worker_driver, batch_df, batch_num, project_dir, _worker_download_dir
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(description='Optimized batch backtesting with persistent session')
     parser.add_argument('--grid-file', type=str, default='data/source_tables/portfolio_allocations_grid.csv')
@@ -323,16 +419,23 @@ def main():
     parser.add_argument('--wait-time', type=int, default=0, help='Seconds between batches (default: 0 for max speed)')
     parser.add_argument('--headless', action='store_true', default=False, help='Run in headless mode')
     parser.add_argument('--no-headless', dest='headless', action='store_false', help='Disable headless mode')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of parallel browser sessions (default: 1)')
+    parser.add_argument('--attach-to', type=int, default=None, metavar='PORT',
+                       help='Reuse a Chrome started with --remote-debugging-port=PORT '
+                            '(keeps the browser and login across runs; single session only)')
     parser.add_argument('--manifest-file', type=str, default='data/batch_files/batch_manifest.csv',
                        help='Path to manifest file (default: data/batch_files/batch_manifest.csv)')
 
     args = parser.parse_args()
+    if args.attach_to and args.workers > 1:
+        parser.error('--attach-to drives one browser and cannot be combined with --workers > 1')
 
     project_dir = os.path.dirname(os.path.abspath(__file__))
 
-    # Split grid into batches
-    df_grid = pd.read_csv(args.grid_file)
-    portfolio_cols = [col for col in df_grid.columns
+    # Split grid into batches; the header alone gives the batch layout
+    grid_columns = pd.read_csv(args.grid_file, nrows=0).columns
+    portfolio_cols = [col for col in grid_columns
                      if col.startswith('Grid_') or col.startswith('Portfolio_') or col.startswith('TreasuryGrid_')]
     num_portfolios = len(portfolio_cols)
     num_batches = (num_portfolios + 2) // 3  # 3 per batch
@@ -344,52 +447,96 @@ def main():
     start_idx = args.start_batch - 1
     end_idx = args.end_batch if args.end_batch else num_batches
 
-    # Initialize persistent browser session
-    driver = initialize_persistent_driver(headless=args.headless)
+    # Parse only the portfolio columns of the requested batches
+    selected_cols = portfolio_cols[start_idx * 3:end_idx * 3]
+    df_grid = pd.read_csv(
+        args.grid_file,
+        usecols=['Asset_Number', 'Asset_Description'] + selected_cols,
+        dtype={'Asset_Description': str, **{col: 'float64' for col in selected_cols}},
+    )
+
+    # Split the grid into batches in memory. The batch files are only kept
+    # for reference, so they are written in the background while the
+    # browser works
+    batch_dir = os.path.join(project_dir, 'data', 'batch_files')
+    os.makedirs(batch_dir, exist_ok=True)
+    # Results land here; created once rather than after every batch
+    os.makedirs(os.path.join(project_dir, 'data', 'source_tables'), exist_ok=True)
+    batch_writer = ThreadPoolExecutor(max_workers=1)
+    batches = []
+    for batch_idx in range(start_idx, end_idx):
+        batch_num = batch_idx + 1
+        start_col = batch_idx * 3
+        end_col = min(start_col + 3, num_portfolios)
+        batch_cols = portfolio_cols[start_col:end_col]
+
+        batch_file = os.path.join(batch_dir, f'batch_{batch_num:03d}_{batch_cols[0]}_to_{batch_cols[-1]}.csv')
+
+        batch_df = df_grid[['Asset_Number', 'Asset_Description'] + batch_cols].copy()
+        batch_writer.submit(batch_df.to_csv, batch_file, index=False)
+        batches.append((batch_num, batch_cols, batch_df))
 
     results_files = []
     failed_batches = []
+    manifest_file = args.manifest_file
+    manifest_dir = os.path.dirname(manifest_file)
+    if manifest_dir:
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    def record_result(batch_num, batch_cols, result_file):
+        if result_file:
+            row = {
+                'batch_num': batch_num,
+                'portfolios': batch_cols,
+                'results_file': result_file
+            }
+            results_files.append(row)
+            append_manifest_row(manifest_file, row)
+        else:
+            failed_batches.append(batch_num)
+
+    if args.workers > 1:
+        # Each worker logs in once and then processes batches independently
+        print(f"Running {len(batches)} batches across {args.workers} browser sessions\n")
+        tasks = [(batch_num, batch_df, project_dir) for batch_num, _, batch_df in batches]
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(args.headless, args.wait_time),
+        ) as executor:
+            for (batch_num, batch_cols, _), result_file in zip(
+                batches, executor.map(_run_batch_in_worker, tasks)
+            ):
+                record_result(batch_num, batch_cols, result_file)
+    else:
+        # Initialize persistent browser session
+        driver = initialize_persistent_driver(headless=args.headless, attach_port=args.attach_to)
 
-    try:
-        # Process each batch
-        for batch_idx in range(start_idx, end_idx):
-            batch_num = batch_idx + 1
-            start_col = batch_idx * 3
-            end_col = min(start_col + 3, num_portfolios)
-            batch_cols = portfolio_cols[start_col:end_col]
-
-            # Create batch file
-            batch_dir = os.path.join(project_dir, 'data', 'batch_files')
-            os.makedirs(batch_dir, exist_ok=True)
-            batch_file = os.path.join(batch_dir, f'batch_{batch_num:03d}_{batch_cols[0]}_to_{batch_cols[-1]}.csv')
-
-            batch_df = df_grid[['Asset_Number', 'Asset_Description'] + batch_cols].copy()
-            batch_df.to_csv(batch_file, index=False)
-
-            # Run batch
-            result_file = run_batch_with_persistent_session(driver, batch_file, batch_num, project_dir)
-
-            if result_file:
-                results_files.append({
-                    'batch_num': batch_num,
-                    'portfolios': batch_cols,
-                    'results_file': result_file
-                })
-            else:
-                failed_batches.append(batch_num)
-
-            # Wait between batches
-            if args.wait_time > 0 and batch_idx < end_idx - 1:
-                print(f"Waiting {args.wait_time}s before next batch...\n")
-                time.sleep(args.wait_time)
-
-    finally:
-        # Close browser
-        print("\n" + "="*80)
-        print("CLOSING BROWSER SESSION")
-        print("="*80)
-        driver.quit()
-        print("✓ Browser closed")
+        try:
+            # Process each batch
+            for i, (batch_num, batch_cols, batch_df) in enumerate(batches):
+                # Run batch
+                result_file = run_batch_with_persistent_session(
+                    driver, batch_df, batch_num, project_dir
+                )
+                record_result(batch_num, batch_cols, result_file)
+
+                # Wait between batches
+                if args.wait_time > 0 and i < len(batches) - 1:
+                    print(f"Waiting {args.wait_time}s before next batch...\n")
+                    time.sleep(args.wait_time)
+
+        finally:
+            # Close browser
+            print("\n" + "="*80)
+            print("CLOSING BROWSER SESSION")
+            print("="*80)
+            # An attached browser is only detached from, not closed
+            driver.quit()
+            print("✓ Detached; browser left running" if args.attach_to else "✓ Browser closed")
+
+    # Make sure every batch file is on disk before reporting
+    batch_writer.shutdown(wait=True)
 
     # Save manifest
     print("\n" + "="*80)
@@ -401,17 +548,13 @@ def main():
     if failed_batches:
         print(f"\nFailed batches: {failed_batches}")
 
-    # Save manifest
-    manifest_file = args.manifest_file
-    df_manifest = pd.DataFrame(results_files)
-    if not df_manifest.empty:
-        # Append to existing manifest if it exists
-        if os.path.exists(manifest_file):
-            df_existing = pd.read_csv(manifest_file)
-            df_manifest = pd.concat([df_existing, df_manifest], ignore_index=True)
-            df_manifest = df_manifest.drop_duplicates(subset=['batch_num'], keep='last')
-
-        df_manifest.to_csv(manifest_file, index=False)
+    # Rows were appended as batches finished; re-running a batch leaves an
+    # older row for it, so keep only the latest one per batch
+    if results_files:
+        df_manifest = pd.read_csv(manifest_file)
+        df_deduped = df_manifest.drop_duplicates(subset=['batch_num'], keep='last')
+        if len(df_deduped) < len(df_manifest):
+            df_deduped.to_csv(manifest_file, index=False)
         print(f"\n✓ Manifest saved: {manifest_file}")
 
     print("\n" + "="*80)